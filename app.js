@@ -2,9 +2,10 @@
 const CONF_THR = 0.20;
 const STABLE_N  = 3;
 const JPEG_QUAL = 0.85;
+/* per-tab id: lets the server drop our stale frames, latest wins */
+const CLIENT_ID = (crypto.randomUUID?.() ?? Math.random().toString(36).slice(2));
 
 /* ---------- globals ---------- */
-let flavor           = {};
 let labels           = [];
 let last             = -1, same = 0;
 let speaking         = false;
@@ -15,10 +16,8 @@ let predictController=null;
 /* ---------- preload assets ---------- */
 async function loadAssets(){
   try{
-    const [flv, cls] = await Promise.all([
-      fetch("flavor_text.json"), fetch("class_indices.json")
-    ]);
-    flavor = flv.ok ? await flv.json() : {};
+    /* flavor text is fetched per species (api/batch), not as the whole 1 MB file */
+    const cls = await fetch("class_indices.json");
     const classIdx = cls.ok ? await cls.json() : {};
     labels = [];
     if(classIdx && typeof classIdx==="object"){
@@ -119,6 +118,61 @@ function buildTierTabs(fullSets){
   });
 }
 
+/* split a raw set's free-text lines into fields (the server normally did this already) */
+function parseSet(src){
+  const set={...src};                          /* shallow clone */
+  let movesArr = [], credits=[];
+  const pushLine=lineRaw=>{
+    const line=cleanLine(lineRaw); if(!line) return;
+    const low=line.toLowerCase();
+
+    if(CREDIT_RE.test(low)){credits.push(line);return;}
+
+    /* EV / IV */
+    if(low.startsWith("evs:")||EV_RE.test(line)){set.evs=set.evs?`${set.evs} / ${line}`:line;return;}
+    if(low.startsWith("ivs:")){set.ivs=set.ivs?`${set.ivs} / ${line.slice(4).trim()}`:line.slice(4).trim();return;}
+
+    /* nature */
+    if(NATURES.includes(line.trim())){set.nature=set.nature?`${set.nature} / ${line}`:line;return;}
+    if(low.startsWith("nature:")){set.nature=line.split(":").slice(1).join(":").trim();return;}
+
+    /* ability */
+    if(low.startsWith("ability:")){set.ability=cleanAbility(line.split(":").slice(1).join(":"));return;}
+    if(/this pokemon'?s /i.test(low)){set.ability=cleanAbility(line);return;}
+
+    /* item */
+    if(low.startsWith("item:")||/(choice|band|scarf|boots|orb|helmet|leftovers|berry|vest|plate|seed|belt)/i.test(low)){
+      const val=cleanItem(line.split(":").slice(1).join(":")||line);
+      set.item=set.item?`${set.item} / ${val}`:val;return;
+    }
+
+    /* tera */
+    if(low.startsWith("tera")){const val=line.replace(/^tera( type)?:?/i,"").trim();
+      set.teratypes=set.teratypes?`${set.teratypes} / ${val}`:val;return;}
+
+    /* otherwise treat as move line */
+    const name = cleanMove(line);
+    const desc = line.slice(name.length).trim();
+    movesArr.push({name, desc});
+  };
+
+  (Array.isArray(set.moves)?set.moves:[]).forEach(pushLine);
+  /* dedupe identical moves (keep first description) */
+  const seenNames=new Set();
+  movesArr = movesArr.filter(m=>{
+    if(seenNames.has(m.name)) return false;
+    seenNames.add(m.name); return true;
+  });
+
+  if(credits.length) set.credits=[...new Set(credits)].join(" • ");
+
+  ["item","ability","nature","teratypes"].forEach(k=>{
+    if(typeof set[k]==="string") set[k]=set[k].replace(/\s*\/\s*\/\s*/g," / ");
+  });
+  set.moves=movesArr;
+  return set;
+}
+
 /* ---------- set renderer ---------- */
 function renderTierSets(list,container){
   container.innerHTML="";
@@ -129,55 +183,8 @@ function renderTierSets(list,container){
   const frag=document.createDocumentFragment();
 
   list.forEach((src,i)=>{
-    const set={...src};                          /* shallow clone */
-    let movesArr = [], credits=[];
-    const pushLine=lineRaw=>{
-      const line=cleanLine(lineRaw); if(!line) return;
-      const low=line.toLowerCase();
-
-      if(CREDIT_RE.test(low)){credits.push(line);return;}
-
-      /* EV / IV */
-      if(low.startsWith("evs:")||EV_RE.test(line)){set.evs=set.evs?`${set.evs} / ${line}`:line;return;}
-      if(low.startsWith("ivs:")){set.ivs=set.ivs?`${set.ivs} / ${line.slice(4).trim()}`:line.slice(4).trim();return;}
-
-      /* nature */
-      if(NATURES.includes(line.trim())){set.nature=set.nature?`${set.nature} / ${line}`:line;return;}
-      if(low.startsWith("nature:")){set.nature=line.split(":").slice(1).join(":").trim();return;}
-
-      /* ability */
-      if(low.startsWith("ability:")){set.ability=cleanAbility(line.split(":").slice(1).join(":"));return;}
-      if(/this pokemon'?s /i.test(low)){set.ability=cleanAbility(line);return;}
-
-      /* item */
-      if(low.startsWith("item:")||/(choice|band|scarf|boots|orb|helmet|leftovers|berry|vest|plate|seed|belt)/i.test(low)){
-        const val=cleanItem(line.split(":").slice(1).join(":")||line);
-        set.item=set.item?`${set.item} / ${val}`:val;return;
-      }
-
-      /* tera */
-      if(low.startsWith("tera")){const val=line.replace(/^tera( type)?:?/i,"").trim();
-        set.teratypes=set.teratypes?`${set.teratypes} / ${val}`:val;return;}
-
-      /* otherwise treat as move line */
-      const name = cleanMove(line);
-      const desc = line.slice(name.length).trim();
-      movesArr.push({name, desc});
-    };
-
-    (Array.isArray(set.moves)?set.moves:[]).forEach(pushLine);
-    /* dedupe identical moves (keep first description) */
-    const seenNames=new Set();
-    movesArr = movesArr.filter(m=>{
-      if(seenNames.has(m.name)) return false;
-      seenNames.add(m.name); return true;
-    });
-
-    if(credits.length) set.credits=[...new Set(credits)].join(" • ");
-
-    ["item","ability","nature","teratypes"].forEach(k=>{
-      if(typeof set[k]==="string") set[k]=set[k].replace(/\s*\/\s*\/\s*/g," / ");
-    });
+    const set=src.parsed?src:parseSet(src);
+    const movesArr=Array.isArray(set.moves)?set.moves:[];
 
     /* ---------- build card ---------- */
     const card=document.createElement("div");card.className="set-card";if(i>0) card.classList.add("collapsed");
@@ -241,7 +248,7 @@ function toggleAllSets(expand){
 }
 
 /* ---------- stats panel renderer ---------- */
-function renderStats(d){
+function renderStats(d,usage){
   $("#stats-name").textContent=`${d.name}  (#${String(d.dex).padStart(4,"0")})`;
   $("#stats-desc").textContent=d.description||"";
 
@@ -263,10 +270,12 @@ function renderStats(d){
   }
   $("#stats-misc").textContent=`Height: ${mToFtIn(d.height)}   •   Weight: ${kgToLb(d.weight)}`;
 
+  const showUsage=u=>{renderUsageSummary(u);buildTierTabs(u.full_sets||{});};
+  if(usage!==undefined){showUsage(usage||{});return;}   /* came with the batch call */
   const slug=toID(d.name);
   fetch(makeUrl(`api/usage/${slug}`))
     .then(r=>r.ok?r.json():{})
-    .then(u=>{renderUsageSummary(u);buildTierTabs(u.full_sets||{});})
+    .then(showUsage)
     .catch(e=>console.warn("[usage] fetch error",e));
 }
 
@@ -289,15 +298,17 @@ async function loop(){
     ctx.drawImage(cam,(cam.videoWidth-s)/2,(cam.videoHeight-s)/2,s,s,0,0,s,s);
   }
 
-  const jpeg=work.toDataURL("image/jpeg",JPEG_QUAL);
+  const jpeg=await new Promise(r=>work.toBlob(r,"image/jpeg",JPEG_QUAL));
+  if(!jpeg) return requestAnimationFrame(loop);
   if(predictController) predictController.abort();
   predictController=new AbortController();
 
   let data={};
   try{
+    /* raw JPEG body – no base64/JSON wrapping */
     const res=await fetch(makeUrl("api/predict"),{
-      method:"POST",headers:{"Content-Type":"application/json"},
-      body:JSON.stringify({image:jpeg}),signal:predictController.signal
+      method:"POST",headers:{"Content-Type":"image/jpeg","X-Client-ID":CLIENT_ID},
+      body:jpeg,signal:predictController.signal
     });
     if(!res.ok) return requestAnimationFrame(loop);
     data=await res.json();
@@ -344,14 +355,16 @@ $("#start").onclick=async()=>{
 
 $("#btn-stats").onclick=async()=>{
   hide($("#prompt"));promptVisible=false;
-  const slug=toID(currentName);let d={};
+  const slug=toID(currentName);let d={},u,flv=[];
   try{
-    const r=await fetch(makeUrl(`api/pokemon/${slug}`));
-    if(r.ok) d=await r.json(); else console.warn("pokemon fetch failed",r.status);
-  }catch(e){console.warn("pokemon fetch error",e);}
-  renderStats({...d,name:currentName});
+    /* dex entry + usage + flavor text in one round trip */
+    const r=await fetch(makeUrl(`api/batch?slugs=${slug}&include=dex,usage,flavor`));
+    if(r.ok){const b=(await r.json())[slug]||{};d=b.dex||{};u=b.usage||{};flv=b.flavor||[];}
+    else console.warn("batch fetch failed",r.status);
+  }catch(e){console.warn("batch fetch error",e);}
+  renderStats({...d,name:currentName},u);
   show($("#stats-panel"));
-  const txt=d.description||(flavor[currentName.toLowerCase()]?.[0]||"");
+  const txt=d.description||flv[0]||"";
   speakText(txt);
 };
 
@@ -0,0 +1,251 @@
+"""batcher.py
+----------------------------------
+Request-coalescing micro-batcher for the classifier forward pass.
+
+Request threads hand one image to :meth:`MicroBatcher.submit` and get a
+:class:`concurrent.futures.Future` back.  A single worker thread drains
+the queue, stacks whatever arrived within ``max_wait_ms`` of the oldest
+waiting image (up to ``max_batch``), runs ONE forward pass and fans the
+probability rows back to the futures.
+
+Usage::
+
+    batcher = MicroBatcher(lambda x: model.predict(x, verbose=0),
+                           max_batch=32, max_wait_ms=5)
+    probs = batcher.predict(img)          # blocks until its batch is done
+    batcher.stats.snapshot()              # histogram + queue-wait numbers
+
+Images are turned into the model batch by ``prepare`` (default
+``np.stack``); the server passes :meth:`preprocessing.BatchBuffer.fill` so
+decoded uint8 frames are normalised straight into one reused float32 buffer
+on the batcher thread.
+
+Futures cancelled while still queued are dropped before the forward pass.
+Submitting with a ``key`` (the client id) makes the newest frame win:
+an older frame from the same key that is still queued is cancelled on
+the spot and never reaches the model.  ``stats`` counts those as
+``superseded`` and every other dropped future as ``cancelled``, never both.
+"""
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, Hashable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+__all__ = ["MicroBatcher", "BatchStats"]
+
+DEFAULT_MAX_BATCH = 32
+DEFAULT_MAX_WAIT_MS = 5.0
+WAIT_SAMPLES = 2048  # queue-wait reservoir used for percentiles
+
+
+class _Item(NamedTuple):
+    x: np.ndarray
+    future: Future
+    t_enq: float
+
+
+class BatchStats:
+    """Thread-safe counters for the batcher.
+
+    Parameters
+    ----------
+    max_batch: int
+        Largest batch size the histogram needs a bucket for.
+    """
+
+    def __init__(self, max_batch: int) -> None:
+        self._lock = threading.Lock()
+        self.hist: List[int] = [0] * (max_batch + 1)  # index == batch size
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.superseded = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.infer_total = 0.0
+        self._waits: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+
+    def record(self, size: int, waits: List[float], infer_s: float) -> None:
+        with self._lock:
+            self.hist[size] += 1
+            self.batches += 1
+            self.items += size
+            self.infer_total += infer_s
+            for w in waits:
+                self.wait_total += w
+                self.wait_max = max(self.wait_max, w)
+                self._waits.append(w)
+
+    def record_error(self, size: int) -> None:
+        with self._lock:
+            self.errors += size
+
+    def record_cancelled(self, n: int) -> None:
+        with self._lock:
+            self.cancelled += n
+
+    def record_superseded(self) -> None:
+        with self._lock:
+            self.superseded += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-friendly copy of the current numbers (ms units)."""
+        with self._lock:
+            waits = np.fromiter(self._waits, dtype=np.float64)
+            p50, p99 = (np.percentile(waits, [50, 99]) * 1e3) if waits.size else (0.0, 0.0)
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "errors": self.errors,
+                "cancelled": self.cancelled,
+                "superseded": self.superseded,
+                "mean_batch": round(self.items / self.batches, 3) if self.batches else 0.0,
+                "batch_hist": {str(n): c for n, c in enumerate(self.hist) if c},
+                "queue_wait_ms": {
+                    "mean": round(self.wait_total / self.items * 1e3, 3) if self.items else 0.0,
+                    "p50": round(float(p50), 3),
+                    "p99": round(float(p99), 3),
+                    "max": round(self.wait_max * 1e3, 3),
+                },
+                "infer_ms_per_batch": round(self.infer_total / self.batches * 1e3, 3) if self.batches else 0.0,
+            }
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-image requests into batched forward passes.
+
+    Parameters
+    ----------
+    predict_fn: Callable[[np.ndarray], np.ndarray]
+        Runs the model on an ``(N, H, W, C)`` batch and returns ``(N, classes)``.
+    max_batch: int
+        Flush as soon as this many images are waiting.
+    max_wait_ms: float
+        Flush at the latest this long after the oldest waiting image arrived.
+    prepare: Callable[[Sequence[np.ndarray]], np.ndarray] | None
+        Builds the model batch from the queued images (default ``np.stack``).
+        Only ever called from the worker thread.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[np.ndarray], np.ndarray],
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        prepare: Callable[[Sequence[np.ndarray]], np.ndarray] | None = None,
+    ) -> None:
+        if max_batch < 1:
+            raise ValueError("max_batch must be >= 1.")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must be >= 0.")
+
+        self.predict_fn = predict_fn
+        self.prepare = prepare or np.stack
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1e3
+        self.stats = BatchStats(max_batch)
+
+        self._q: "queue.SimpleQueue[_Item]" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._latest: Dict[Hashable, Future] = {}  # key -> newest pending future
+        self._latest_lock = threading.Lock()
+        self._superseded: "weakref.WeakSet[Future]" = weakref.WeakSet()  # not counted as cancelled
+
+    # ------------------------------------------------------------------
+    def submit(self, x: np.ndarray, key: Hashable | None = None) -> Future:
+        """Queue one image and return a future resolving to its prob row.
+
+        With a ``key``, a still-queued earlier future for the same key is
+        cancelled (its waiter gets ``CancelledError``) – latest frame wins.
+        """
+        self._ensure_worker()
+        fut: Future = Future()
+        if key is not None:
+            with self._latest_lock:
+                prev = self._latest.get(key)
+                self._latest[key] = fut
+            if prev is not None and not prev.cancelled():
+                self._superseded.add(prev)
+                if prev.cancel():
+                    self.stats.record_superseded()
+            fut.add_done_callback(lambda f: self._forget(key, f))
+        self._q.put(_Item(x, fut, time.perf_counter()))
+        return fut
+
+    def predict(self, x: np.ndarray, timeout: float | None = None,
+                key: Hashable | None = None) -> np.ndarray:
+        """Blocking convenience wrapper around :meth:`submit`."""
+        return self.submit(x, key).result(timeout)
+
+    def _forget(self, key: Hashable, fut: Future) -> None:
+        with self._latest_lock:
+            if self._latest.get(key) is fut:
+                del self._latest[key]
+
+    # ------------------------------------------------------------------
+    # Worker thread
+    # ------------------------------------------------------------------
+    def _ensure_worker(self) -> None:
+        # Started lazily (and re-started after a fork) so the thread lives in
+        # the process that actually serves requests, e.g. a gunicorn worker.
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._q = queue.SimpleQueue()
+            self._latest = {}
+            self._superseded = weakref.WeakSet()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+            self._thread.start()
+
+    def _collect(self) -> List[_Item]:
+        items = [self._q.get()]
+        deadline = items[0].t_enq + self.max_wait
+        while len(items) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                # past the deadline: still sweep up anything already queued
+                item = self._q.get(timeout=remaining) if remaining > 0 else self._q.get_nowait()
+            except queue.Empty:
+                break
+            items.append(item)
+        return items
+
+    def _run(self) -> None:
+        while True:
+            self._flush(self._collect())
+
+    def _flush(self, items: List[_Item]) -> None:
+        live = [it for it in items if it.future.set_running_or_notify_cancel()]
+        if len(live) != len(items):
+            dropped = [it.future for it in items if it.future.cancelled()]
+            self.stats.record_cancelled(sum(f not in self._superseded for f in dropped))
+        if not live:
+            return
+
+        t0 = time.perf_counter()
+        try:
+            out = self.predict_fn(self.prepare([it.x for it in live]))
+        except Exception as exc:  # noqa: BLE001 – every waiter gets the error
+            self.stats.record_error(len(live))
+            for it in live:
+                it.future.set_exception(exc)
+            return
+        t1 = time.perf_counter()
+
+        for it, row in zip(live, out):
+            it.future.set_result(row)
+        self.stats.record(len(live), [t0 - it.t_enq for it in live], t1 - t0)
@@ -0,0 +1,72 @@
+"""bench_decode.py
+----------------------------------
+Decode + resize time per image, full decode vs. DCT-scaled (``draft``).
+
+Usage::
+
+    python bench_decode.py                        # synthetic JPEGs, 4 sizes
+    python bench_decode.py --images ~/frames -n 20
+
+Synthetic frames are smooth gradients plus mild noise, which compress and
+decode much like camera frames do (pure noise would not).
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+from PIL import Image
+
+from preprocessing import decode_image
+
+INPUT_SIZE = (224, 224)
+RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080), (4032, 3024)]
+
+
+def synthetic_jpeg(w: int, h: int, quality: int = 85) -> bytes:
+    rng = np.random.default_rng(w * h)
+    yy, xx = np.mgrid[0:h, 0:w].astype(np.float32)
+    img = np.stack([xx / w * 255, yy / h * 255, (xx + yy) / (w + h) * 255], -1)
+    img += rng.normal(0, 8, img.shape)
+    buf = io.BytesIO()
+    Image.fromarray(img.clip(0, 255).astype(np.uint8)).save(buf, "JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def time_decode(blob: bytes, fast: bool, iters: int) -> float:
+    """Median ms per decode+resize."""
+    times: List[float] = []
+    for _ in range(iters):
+        t0 = time.perf_counter()
+        decode_image(io.BytesIO(blob), INPUT_SIZE, fast=fast)
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times) * 1e3)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark full vs. DCT-scaled JPEG decode.")
+    ap.add_argument("--images", type=Path, help="folder of real JPEGs instead of synthetic frames")
+    ap.add_argument("-n", "--iters", type=int, default=30)
+    args = ap.parse_args()
+
+    cases: Dict[str, bytes] = {}
+    if args.images:
+        for p in sorted(args.images.glob("*.jp*g")):
+            cases[p.name] = p.read_bytes()
+    else:
+        for w, h in RESOLUTIONS:
+            cases[f"{w}x{h}"] = synthetic_jpeg(w, h)
+
+    print(f"{'image':<18}{'KB':>8}{'full ms':>10}{'draft ms':>10}{'speedup':>9}")
+    for name, blob in cases.items():
+        full = time_decode(blob, False, args.iters)
+        fast = time_decode(blob, True, args.iters)
+        print(f"{name:<18}{len(blob) / 1024:>8.0f}{full:>10.2f}{fast:>10.2f}{full / fast:>8.1f}×")
+
+
+if __name__ == "__main__":
+    main()
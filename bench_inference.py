@@ -0,0 +1,67 @@
+"""bench_inference.py
+----------------------------------
+Latency benchmark for the inference backends in :mod:`inference`.
+
+Runs every requested backend over the same random batches and prints
+p50 / p99 / mean per batch size, e.g.::
+
+    python bench_inference.py                          # keras vs tf-function
+    python bench_inference.py --backends tf-function --batches 1 4 32 -n 200
+
+Numbers are wall-clock milliseconds per ``backend.predict`` call, measured
+after each backend's own :meth:`~inference.Backend.warmup`.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import Dict, List
+
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import numpy as np
+
+from inference import BACKENDS, load_backend
+
+ROOT = Path(__file__).resolve().parent
+
+
+def bench(backend, batch: int, iters: int, rng: np.random.Generator) -> Dict[str, float]:
+    x = rng.normal(0, 60, (batch, *backend.input_shape)).astype(np.float32)
+    times: List[float] = []
+    for _ in range(iters):
+        t0 = time.perf_counter()
+        backend.predict(x)
+        times.append(time.perf_counter() - t0)
+    ms = np.asarray(times) * 1e3
+    return {
+        "p50": float(np.percentile(ms, 50)),
+        "p99": float(np.percentile(ms, 99)),
+        "mean": float(ms.mean()),
+        "img_s": batch / (ms.mean() / 1e3),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    ap.add_argument("--model", type=Path, default=ROOT / "pokedex_resnet50.h5")
+    ap.add_argument("--backends", nargs="+", default=["keras", "tf-function"], choices=list(BACKENDS))
+    ap.add_argument("--batches", nargs="+", type=int, default=[1, 8, 32])
+    ap.add_argument("-n", "--iters", type=int, default=50)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'backend':<14}{'batch':>6}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}{'img/s':>10}")
+    for name in args.backends:
+        backend = load_backend(name, args.model)
+        backend.warmup()
+        for b in args.batches:
+            r = bench(backend, b, args.iters, rng)
+            print(f"{name:<14}{b:>6}{r['p50']:>10.2f}{r['p99']:>10.2f}{r['mean']:>10.2f}{r['img_s']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
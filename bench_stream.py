@@ -0,0 +1,80 @@
+"""bench_stream.py
+----------------------------------
+Frames per second per client: HTTP polling vs. the ``/api/stream`` WebSocket.
+
+Point it at a running ``predict_asgi`` server::
+
+    uvicorn predict_asgi:app --port 7860 &
+    python bench_stream.py --url http://localhost:7860 --clients 1 4 16
+
+Every simulated client sends the same camera-sized JPEG in a loop, the way
+``app.js`` does: HTTP clients wait for each response before posting the
+next frame, WebSocket clients keep one frame in flight.  Each run lasts
+``--seconds``; the table shows answered frames per second per client, in
+total, and per server core (``--server-cores``, default this machine's).
+
+Needs ``httpx`` and ``websockets`` (``pip install httpx websockets``).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from typing import Callable, Dict
+
+from bench_decode import synthetic_jpeg
+
+
+async def http_client(url: str, frame: bytes, cid: str, until: float) -> int:
+    import httpx
+
+    n = 0
+    async with httpx.AsyncClient(timeout=30) as http:
+        while time.perf_counter() < until:
+            r = await http.post(f"{url}/api/predict?cache=0", content=frame,
+                                headers={"Content-Type": "image/jpeg", "X-Client-ID": cid})
+            n += r.status_code == 200
+    return n
+
+
+async def ws_client(url: str, frame: bytes, cid: str, until: float) -> int:
+    import websockets
+
+    n = 0
+    async with websockets.connect(url.replace("http", "ws", 1) + "/api/stream?cache=0",
+                                  max_size=None) as ws:
+        while time.perf_counter() < until:
+            await ws.send(frame)
+            await ws.recv()
+            n += 1
+    return n
+
+
+async def run(client: Callable, url: str, frame: bytes, clients: int, seconds: float) -> float:
+    until = time.perf_counter() + seconds
+    counts = await asyncio.gather(*(client(url, frame, f"bench-{i}", until) for i in range(clients)))
+    return sum(counts) / seconds
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    ap.add_argument("--url", default="http://localhost:7860")
+    ap.add_argument("--clients", nargs="+", type=int, default=[1, 4, 16])
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--size", default="1280x720", help="synthetic frame WxH")
+    ap.add_argument("--server-cores", type=int, default=os.cpu_count())
+    args = ap.parse_args()
+
+    w, h = map(int, args.size.split("x"))
+    frame = synthetic_jpeg(w, h)
+    modes: Dict[str, Callable] = {"http": http_client, "ws": ws_client}
+    print(f"{'mode':<6}{'clients':>8}{'fps/client':>12}{'fps total':>11}{'fps/core':>10}")
+    for n in args.clients:
+        for name, client in modes.items():
+            fps = asyncio.run(run(client, args.url, frame, n, args.seconds))
+            print(f"{name:<6}{n:>8}{fps / n:>12.1f}{fps:>11.1f}{fps / args.server_cores:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
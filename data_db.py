@@ -0,0 +1,222 @@
+"""data_db.py
+----------------------------------
+One read-only SQLite file holding the Pokédex, usage and flavor text, for
+point lookups that don't keep the data in every worker.
+
+Usage::
+
+    python data_db.py                       # *.json -> pointkedex.db
+    python data_db.py -o /srv/pointkedex.db
+
+    dex = DexDB("pointkedex.db")
+    dex.json("pikachu")                     # b'{"dex":25,...}', same bytes as DexStore
+    UsageDB("pointkedex.db").json("garchomp", tier="OU", fields="sets")
+    FlavorDB("pointkedex.db").json("pikachu", first=True)
+
+The build step stores exactly the bytes the in-memory stores would send
+(:class:`dex_store.DexStore` entries, :class:`usage_store.UsageStore`
+fragments, deduplicated :class:`flavor_store.FlavorStore` lists), plus the source files' hashes as ``version``, so
+responses and ``X-Data-Version`` don't depend on which backend served them.
+
+Readers open the file ``mode=ro&immutable=1`` with ``mmap_size`` set
+(``DATA_DB_MMAP_MB``), so pages come straight from the OS page cache that
+every worker shares; a worker only keeps the rows it served recently, in
+a per-store LRU (``DATA_DB_CACHE``).  Each thread gets its own connection,
+re-opened after a fork.
+
+``immutable`` means the file must never change under a reader: the build
+writes a temporary file and renames it into place, and hot reload opens
+the new one.
+"""
+from __future__ import annotations
+
+import argparse
+import functools
+import os
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import quote
+
+from dex_store import encode
+from flavor_store import FlavorStore
+from usage_sets import parse_usage
+from usage_store import UsageStore, _Entry, file_version, iter_json_items, normalize_key
+
+__all__ = ["DexDB", "UsageDB", "FlavorDB", "build_db"]
+
+ROOT = Path(__file__).resolve().parent
+DB_CACHE = int(os.getenv("DATA_DB_CACHE", "512"))              # rows per store per worker
+DB_MMAP  = int(os.getenv("DATA_DB_MMAP_MB", "256")) * 2**20
+
+SCHEMA = """
+CREATE TABLE meta       (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+CREATE TABLE dex        (slug TEXT PRIMARY KEY, row INTEGER, dex INTEGER, json BLOB) WITHOUT ROWID;
+CREATE INDEX dex_by_num ON dex (dex, row);
+CREATE TABLE usage      (key TEXT PRIMARY KEY, rest BLOB, idx BLOB) WITHOUT ROWID;
+CREATE TABLE usage_sets (key TEXT, tier TEXT, sets BLOB, PRIMARY KEY (key, tier)) WITHOUT ROWID;
+CREATE TABLE flavor     (slug TEXT PRIMARY KEY, json BLOB, first BLOB) WITHOUT ROWID;
+"""
+
+
+# ---------- build ----------
+def build_db(dst: Path, dex_path: Path, usage_path: Path, flavor_path: Path) -> Dict[str, int]:
+    """Compile the three JSON files into ``dst``; returns row counts per table."""
+    dst = Path(dst)
+    tmp = dst.with_name(dst.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    con = sqlite3.connect(tmp)
+    con.executescript("PRAGMA journal_mode=OFF; PRAGMA synchronous=OFF;" + SCHEMA)
+    counts = {"dex": 0, "usage": 0, "flavor": 0}
+    meta = {}
+
+    dex_rows = ((s, i, e.get("dex") or 0, encode(e))
+                for i, (s, e) in enumerate(iter_json_items(dex_path)))
+    counts["dex"] = con.executemany("INSERT INTO dex VALUES (?, ?, ?, ?)", dex_rows).rowcount
+    meta["pokedex"] = file_version(dex_path)
+
+    raw = 0
+    if Path(usage_path).exists():
+        for name, blob in iter_json_items(usage_path):
+            raw += 1
+            key = normalize_key(name)
+            rest, idx, tiers = _Entry(parse_usage(blob)).parts()
+            con.execute("DELETE FROM usage_sets WHERE key = ?", (key,))  # a later duplicate wins
+            con.execute("INSERT OR REPLACE INTO usage VALUES (?, ?, ?)", (key, rest, idx))
+            con.executemany("INSERT INTO usage_sets VALUES (?, ?, ?)", ((key, t, b) for t, b in tiers.items()))
+        meta["usage"] = file_version(usage_path)
+    else:
+        meta["usage"] = "none"
+    counts["usage"] = con.execute("SELECT count(*) FROM usage").fetchone()[0]
+    meta["usage_raw"] = str(raw)
+
+    flavor = FlavorStore.load(flavor_path)  # deduplicated lists, same bytes as the in-memory store
+    flavor_rows = ((s, flavor.json(s), flavor.json(s, first=True)) for s in flavor.slugs())
+    counts["flavor"] = con.executemany("INSERT INTO flavor VALUES (?, ?, ?)", flavor_rows).rowcount
+    meta["flavor"] = flavor.version
+
+    con.executemany("INSERT INTO meta VALUES (?, ?)", meta.items())
+    con.commit()
+    con.execute("VACUUM")
+    con.close()
+    os.replace(tmp, dst)
+    return counts
+
+
+# ---------- read ----------
+def connect(path: Path) -> sqlite3.Connection:
+    uri = f"file:{quote(str(Path(path).resolve()))}?mode=ro&immutable=1"
+    con = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    con.execute(f"PRAGMA mmap_size = {DB_MMAP}")
+    con.execute("PRAGMA query_only = 1")
+    return con
+
+
+class _ReadOnlyDB:
+    """Per-thread (and per-process) connections to a read-only data file."""
+
+    table = ""
+    meta_key = ""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._local = threading.local()
+        meta = dict(self._query("SELECT key, value FROM meta").fetchall())
+        self.version = meta[self.meta_key]
+        self._meta = meta
+        self._len = self._query(f"SELECT count(*) FROM {self.table}").fetchone()[0]
+        self._cached = functools.lru_cache(maxsize=DB_CACHE)(self._fetch)
+
+    @classmethod
+    def open(cls, path: Path):
+        return cls(path)
+
+    def _query(self, sql: str, *args: object) -> sqlite3.Cursor:
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():  # forked with the parent's thread-local
+            local.con, local.pid = connect(self.path), os.getpid()
+        return local.con.execute(sql, args)
+
+    def _fetch(self, key: str, *args: object):
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        return self._len
+
+
+class DexDB(_ReadOnlyDB):
+    """Pokédex entry bytes by slug or national dex number (see :meth:`DexStore.json`)."""
+
+    table = "dex"
+    meta_key = "pokedex"
+
+    def json(self, key: str) -> Optional[bytes]:
+        return self._cached(key.lower())
+
+    def __contains__(self, key: str) -> bool:
+        return self.json(key) is not None
+
+    def _fetch(self, key: str) -> Optional[bytes]:
+        if key.isascii() and key.isdigit():  # first form wins, as in DexStore
+            hit = self._query("SELECT json FROM dex WHERE dex = ? ORDER BY row LIMIT 1", int(key)).fetchone()
+        else:
+            hit = self._query("SELECT json FROM dex WHERE slug = ?", key).fetchone()
+        return None if hit is None else hit[0]
+
+
+class UsageDB(_ReadOnlyDB, UsageStore):
+    """:class:`UsageStore` whose entries are read from the database on demand."""
+
+    table = "usage"
+    meta_key = "usage"
+
+    def __init__(self, path: Path) -> None:
+        super().__init__(path)
+        self.raw_count = int(self._meta["usage_raw"])
+
+    def _entry(self, slug: str) -> Optional[_Entry]:
+        return self._cached(normalize_key(slug))
+
+    def _fetch(self, key: str) -> Optional[_Entry]:
+        hit = self._query("SELECT rest, idx FROM usage WHERE key = ?", key).fetchone()
+        if hit is None:
+            return None
+        tiers = dict(self._query("SELECT tier, sets FROM usage_sets WHERE key = ? ORDER BY tier", key).fetchall())
+        return _Entry.from_parts(hit[0], hit[1], tiers)
+
+
+class FlavorDB(_ReadOnlyDB):
+    """Flavor-text list bytes by slug, like :class:`FlavorStore`."""
+
+    table = "flavor"
+    meta_key = "flavor"
+
+    def json(self, slug: str, first: bool = False) -> Optional[bytes]:
+        return self._cached(normalize_key(slug), first)
+
+    def get(self, slug: str) -> Optional[bytes]:
+        return self.json(slug)
+
+    def _fetch(self, slug: str, first: bool = False) -> Optional[bytes]:
+        col = "first" if first else "json"
+        hit = self._query(f"SELECT {col} FROM flavor WHERE slug = ?", slug).fetchone()
+        return None if hit is None else hit[0]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Compile the Pokédex, usage and flavor JSON into one SQLite file.")
+    ap.add_argument("-o", "--out", type=Path, default=ROOT / "pointkedex.db")
+    ap.add_argument("--dex", type=Path, default=ROOT / "pokedex_data.json")
+    ap.add_argument("--usage", type=Path, default=ROOT / "usage_data.json")
+    ap.add_argument("--flavor", type=Path, default=ROOT / "flavor_text.json")
+    args = ap.parse_args()
+
+    counts = build_db(args.out, args.dex, args.usage, args.flavor)
+    print(f"[✓] {counts['dex']} dex, {counts['usage']} usage, {counts['flavor']} flavor rows -> "
+          f"{args.out} ({args.out.stat().st_size / 2**20:.1f} MB)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""dex_store.py
+----------------------------------
+Indexed, columnar view of ``pokedex_data.json``.
+
+Usage::
+
+    dex = DexStore.load(DEX_PATH)
+    dex.json("pikachu")            # b'{"dex":25,...}' – serialised once at load
+    dex.json("25")                 # same entry by national dex number
+    dex.rows_with_type("water")    # np.ndarray of row numbers
+    dex.stats[dex.row("pikachu")]  # int16 base stats in STAT_KEYS order
+    dex.page(dex.select({"type": "water", "min_speed": "100", "sort": "-attack"}), 0, 20)
+
+Each entry's JSON response is encoded once at load, so a lookup is a dict
+hit that returns bytes.  Base stats, types, dex number, height and weight
+also live in NumPy columns (one row per species, in file order) so queries
+over the whole dex are vectorised, and dex number / type / ability map to
+rows through secondary indexes.
+
+:meth:`DexStore.select` filters and sorts all rows with array operations
+from query-string style parameters:
+
+``type=water[,flying]``      has every listed type
+``ability=swift-swim``       has the ability
+``min_<stat>`` / ``max_<stat>``  inclusive bounds on a base stat, ``total``
+                             (base stat total), ``dex``, ``height`` or
+                             ``weight``; ``special_attack`` == ``special-attack``
+``sort=[-]<field>``          any bounded field or ``name``; ``-`` = descending,
+                             ties broken by dex number (default ``dex``)
+
+Bad parameters raise ``ValueError``.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+
+__all__ = ["DexStore", "STAT_KEYS", "PAGE_DEFAULT", "PAGE_MAX"]
+
+STAT_KEYS = ("hp", "attack", "defense", "special-attack", "special-defense", "speed")
+PAGE_DEFAULT = 50
+PAGE_MAX = 200
+
+
+def encode(obj: Any) -> bytes:
+    """Compact JSON, the way Flask's ``jsonify`` would send it."""
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+class DexStore:
+    """Read-only Pokédex: pre-serialised entries, column arrays, indexes.
+
+    Parameters
+    ----------
+    raw: Mapping[str, dict]
+        ``pokedex_data.json`` contents, slug -> entry.
+    """
+
+    def __init__(self, raw: Mapping[str, Dict[str, Any]]) -> None:
+        self.slugs: List[str] = list(raw)
+        self._rows: Dict[str, int] = {s: i for i, s in enumerate(self.slugs)}
+        self._json: List[bytes] = [encode(raw[s]) for s in self.slugs]
+
+        n = len(self.slugs)
+        self.dex = np.zeros(n, np.int16)
+        self.stats = np.zeros((n, len(STAT_KEYS)), np.int16)
+        self.height = np.zeros(n, np.int32)
+        self.weight = np.zeros(n, np.int32)
+        self.types = np.full((n, 2), -1, np.int8)  # codes into type_names; -1 = none
+        self.type_names: List[str] = sorted({t for e in raw.values() for t in e.get("types", [])})
+        type_code = {t: i for i, t in enumerate(self.type_names)}
+
+        by_dex: Dict[int, int] = {}
+        by_type: Dict[str, List[int]] = {t: [] for t in self.type_names}
+        by_ability: Dict[str, List[int]] = {}
+        for i, s in enumerate(self.slugs):
+            e = raw[s]
+            self.dex[i] = e.get("dex") or 0
+            bs = e.get("base_stats") or {}
+            self.stats[i] = [bs.get(k, 0) for k in STAT_KEYS]
+            self.height[i] = e.get("height") or 0
+            self.weight[i] = e.get("weight") or 0
+            for j, t in enumerate(e.get("types", [])[:2]):
+                self.types[i, j] = type_code[t]
+                by_type[t].append(i)
+            for a in e.get("abilities", []):
+                by_ability.setdefault(a, []).append(i)
+            by_dex.setdefault(int(self.dex[i]), i)  # first form wins
+
+        self._total = self.stats.sum(1, dtype=np.int32)
+        self._name_rank = np.argsort(np.argsort(np.asarray(self.slugs)))
+        self._by_dex = by_dex
+        self._by_type = {t: np.asarray(r, np.int32) for t, r in by_type.items()}
+        self._by_ability = {a: np.asarray(r, np.int32) for a, r in by_ability.items()}
+
+    version = ""  # content hash of the file it was loaded from
+
+    @classmethod
+    def load(cls, path: Path) -> "DexStore":
+        data = Path(path).read_bytes()
+        store = cls(json.loads(data))
+        store.version = hashlib.sha256(data).hexdigest()[:12]
+        return store
+
+    def __len__(self) -> int:
+        return len(self.slugs)
+
+    def __contains__(self, slug: str) -> bool:
+        return self.row(slug) is not None
+
+    # ------------------------------------------------------------------
+    def row(self, key: str) -> Optional[int]:
+        """Row for a slug (case-insensitive) or a national dex number."""
+        key = key.lower()
+        if key.isascii() and key.isdigit():  # "²" is isdigit() but not int()-able
+            return self._by_dex.get(int(key))
+        return self._rows.get(key)
+
+    def json(self, key: str) -> Optional[bytes]:
+        """The entry's pre-serialised JSON, or ``None``."""
+        i = self.row(key)
+        return None if i is None else self._json[i]
+
+    def json_at(self, row: int) -> bytes:
+        return self._json[row]
+
+    def rows_with_type(self, type_: str) -> np.ndarray:
+        return self._by_type.get(type_.lower(), np.empty(0, np.int32))
+
+    def rows_with_ability(self, ability: str) -> np.ndarray:
+        return self._by_ability.get(ability.lower(), np.empty(0, np.int32))
+
+    @property
+    def abilities(self) -> List[str]:
+        return sorted(self._by_ability)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def column(self, field: str) -> np.ndarray:
+        """Numeric column by name: a stat, ``total``, ``dex``, ``height`` or ``weight``."""
+        field = field.replace("_", "-")
+        if field in STAT_KEYS:
+            return self.stats[:, STAT_KEYS.index(field)]
+        if field == "total":
+            return self._total
+        if field in ("dex", "height", "weight"):
+            return getattr(self, field)
+        raise ValueError(f"unknown field {field!r}")
+
+    def select(self, params: Mapping[str, str]) -> np.ndarray:
+        """Rows matching ``params`` (see module docstring), in sort order."""
+        mask = np.ones(len(self), bool)
+        for key, value in params.items():
+            if key == "type":
+                for t in value.split(","):
+                    if t.strip().lower() not in self.type_names:
+                        raise ValueError(f"unknown type {t!r}")
+                    mask &= (self.types == self.type_names.index(t.strip().lower())).any(1)
+            elif key == "ability":
+                hit = np.zeros(len(self), bool)
+                hit[self.rows_with_ability(value)] = True
+                mask &= hit
+            elif key.startswith(("min_", "max_")):
+                try:
+                    bound = int(value)
+                except ValueError:
+                    raise ValueError(f"{key} must be an integer") from None
+                col = self.column(key[4:])
+                mask &= col >= bound if key.startswith("min_") else col <= bound
+        rows = np.flatnonzero(mask)
+
+        sort = params.get("sort", "dex").strip()  # a URL "+" arrives as a space
+        desc = sort.startswith("-")
+        field = sort.lstrip("-+")
+        col = self._name_rank if field == "name" else self.column(field)
+        key = col[rows].astype(np.int64)
+        # lexsort sorts by the last key first; negate for descending
+        return rows[np.lexsort((self.dex[rows], -key if desc else key))]
+
+    def page(self, rows: np.ndarray, offset: int = 0, limit: int = PAGE_DEFAULT) -> bytes:
+        """JSON page ``{"total", "offset", "limit", "next", "results"}`` of ``rows``.
+
+        Results are the stored entry bytes with a ``"slug"`` key spliced in,
+        so nothing is re-encoded.
+        """
+        offset = max(0, offset)
+        limit = max(1, min(limit, PAGE_MAX))
+        chunk = rows[offset:offset + limit]
+        nxt = offset + limit if offset + limit < len(rows) else None
+        head = encode({"total": int(len(rows)), "offset": offset, "limit": limit, "next": nxt})
+        items = (b'{"slug":' + encode(self.slugs[i]) + b"," + self._json[i][1:] for i in chunk)
+        return head[:-1] + b',"results":[' + b",".join(items) + b"]}"
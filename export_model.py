@@ -0,0 +1,219 @@
+"""export_model.py
+----------------------------------
+Convert ``pokedex_resnet50.h5`` into the artefacts the non-Keras inference
+backends load, then prove they still agree with Keras.
+
+Usage::
+
+    python export_model.py --samples ~/dex-photos   # .tflite + .onnx, then parity
+    python export_model.py --formats tflite --no-parity
+    python export_model.py --formats onnx-mmap --samples ~/dex-photos
+    python export_model.py --parity-only --samples ~/dex-photos
+
+Artefacts are written next to the ``.h5`` (``pokedex_resnet50.tflite`` /
+``pokedex_resnet50.onnx`` / ``pokedex_resnet50.mmap.onnx`` plus
+``pokedex_resnet50.weights.bin``), which is where
+:func:`inference.load_backend` looks for them.  The parity check runs every exported backend and the
+Keras model over the same sample set and exits non-zero when top-1
+agreement drops below ``--min-agreement``.  ``--samples`` must point at real
+photos: random tensors say nothing about agreement on what users upload.
+``tests/test_export_parity.py`` runs the same check under pytest.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import numpy as np
+import tensorflow as tf
+
+from inference import WEIGHTS_ALIGN, KerasBackend, load_backend, weights_path
+from preprocessing import caffe_preprocess, decode_image
+
+ROOT = Path(__file__).resolve().parent
+MODEL_PATH = ROOT / "pokedex_resnet50.h5"
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp"}
+EXPORTERS = ("tflite", "onnx", "onnx-mmap")
+SUFFIXES = {"tflite": ".tflite", "onnx": ".onnx", "onnx-mmap": ".mmap.onnx"}
+
+
+# ------------------------------------------------------------------
+# Exporters
+# ------------------------------------------------------------------
+def _forward_fn(model):
+    """Dynamic-batch forward function + input spec for tf2onnx."""
+    spec = tf.TensorSpec((None, *model.input_shape[1:]), tf.float32, name="input")
+    return tf.function(lambda x: model(x, training=False)), spec
+
+
+def export_tflite(model, out: Path) -> Path:
+    # from_keras_model freezes the variables and keeps the batch axis dynamic
+    out.write_bytes(tf.lite.TFLiteConverter.from_keras_model(model).convert())
+    return out
+
+
+def export_onnx(model, out: Path, opset: int = 17) -> Path:
+    try:
+        import tf2onnx
+    except ImportError as exc:  # pragma: no cover – optional dep
+        raise ImportError("tf2onnx must be installed: `pip install tf2onnx`") from exc
+
+    fn, spec = _forward_fn(model)
+    tf2onnx.convert.from_function(fn, input_signature=(spec,), opset=opset, output_path=str(out))
+    return out
+
+
+def write_weights(tensors: Dict[str, np.ndarray], out: Path) -> Dict[str, int]:
+    """Write ``tensors`` in the flat layout :func:`inference.map_weights` reads.
+
+    Returns each tensor's byte offset from the start of the file.
+    """
+    align = lambda n: -(-n // WEIGHTS_ALIGN) * WEIGHTS_ALIGN
+    header: Dict[str, Dict] = {
+        k: {"dtype": v.dtype.str, "shape": list(v.shape), "offset": 0} for k, v in tensors.items()
+    }
+    # offsets depend on the header size and vice versa: size the header with
+    # placeholder offsets wide enough for any real one, then pad it to fit
+    probe = {k: dict(h, offset=2**40) for k, h in header.items()}
+    pos = align(8 + len(json.dumps(probe).encode()))
+    for k, v in tensors.items():
+        header[k]["offset"] = pos
+        pos = align(pos + v.nbytes)
+    blob = json.dumps(header).encode()
+    blob += b" " * (align(8 + len(blob)) - 8 - len(blob))
+    with out.open("wb") as f:
+        f.write(np.uint64(len(blob)).astype("<u8").tobytes())
+        f.write(blob)
+        for k, v in tensors.items():
+            f.write(b"\0" * (header[k]["offset"] - f.tell()))
+            f.write(np.ascontiguousarray(v).tobytes())
+    return {k: h["offset"] for k, h in header.items()}
+
+
+def export_onnx_mmap(model, out: Path, opset: int = 17) -> Path:
+    """ONNX graph with its weights moved into a flat, mappable file.
+
+    The graph is optimised here, once, with ONNX Runtime's extended
+    (hardware-independent) passes; the server then runs it with online
+    optimisation off so the mapped weights are used in place.
+    """
+    try:
+        import onnx
+        import onnxruntime as ort
+        from onnx import numpy_helper
+        from onnx.external_data_helper import set_external_data
+    except ImportError as exc:  # pragma: no cover – optional dep
+        raise ImportError("onnx and onnxruntime must be installed: `pip install onnx onnxruntime`") from exc
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw, optimised = Path(tmp) / "raw.onnx", Path(tmp) / "opt.onnx"
+        export_onnx(model, raw, opset)
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+        opts.optimized_model_filepath = str(optimised)
+        ort.InferenceSession(str(raw), opts, providers=["CPUExecutionProvider"])
+        proto = onnx.load(str(optimised))
+
+    inits = proto.graph.initializer
+    tensors = {t.name: numpy_helper.to_array(t) for t in inits}
+    weights = weights_path(out.with_suffix("").with_suffix(""))
+    offsets = write_weights(tensors, weights)
+    for t in inits:
+        t.CopyFrom(numpy_helper.from_array(tensors[t.name], t.name))
+        set_external_data(t, weights.name, offsets[t.name], tensors[t.name].nbytes)
+        t.ClearField("raw_data")
+        t.data_location = onnx.TensorProto.EXTERNAL
+    onnx.save(proto, str(out))
+    print(f"[✓] wrote {weights.name} ({weights.stat().st_size / 2**20:.1f} MB, {len(tensors)} tensors)",
+          file=sys.stderr)
+    return out
+
+
+# ------------------------------------------------------------------
+# Parity
+# ------------------------------------------------------------------
+def list_images(folder: Path, limit: int, seed: int | None = None) -> List[Path]:
+    """Up to ``limit`` image paths under ``folder``; shuffled when ``seed`` is set."""
+    files = sorted(p for p in folder.rglob("*") if p.suffix.lower() in IMAGE_EXTS)
+    if not files:
+        raise SystemExit(f"no images under {folder}")
+    if seed is not None:
+        np.random.default_rng(seed).shuffle(files)
+    return files[:limit]
+
+
+def preprocess_files(files: Sequence[Path], input_shape: Sequence[int]) -> np.ndarray:
+    """Same decode + caffe normalisation as the server applies to uploads."""
+    size = tuple(input_shape[:2][::-1])
+    rgb = []
+    for f in files:
+        with f.open("rb") as fp:
+            rgb.append(np.asarray(decode_image(fp, size)))
+    return caffe_preprocess(np.stack(rgb))
+
+
+def load_samples(folder: Path, limit: int, input_shape: Sequence[int],
+                 seed: int | None = None) -> np.ndarray:
+    """Preprocess up to ``limit`` images from ``folder`` (recursively)."""
+    return preprocess_files(list_images(folder, limit, seed), input_shape)
+
+
+def predict_all(backend, x: np.ndarray, batch: int = 16) -> np.ndarray:
+    return np.concatenate([backend.predict(x[i:i + batch]) for i in range(0, len(x), batch)])
+
+
+def check_parity(reference, backends: Dict[str, object], x: np.ndarray, min_agreement: float) -> bool:
+    """Compare top-1 of every backend against ``reference`` over ``x``."""
+    ref = predict_all(reference, x)
+    ref_top1 = ref.argmax(1)
+    ok = True
+    for name, backend in backends.items():
+        out = predict_all(backend, x)
+        agree = float((out.argmax(1) == ref_top1).mean())
+        max_diff = float(np.abs(out - ref).max())
+        status = "✓" if agree >= min_agreement else "✗"
+        print(f"[{status}] {name:<12} top-1 agreement {agree:.2%} over {len(x)} samples, "
+              f"max |Δp| {max_diff:.2e}", file=sys.stderr)
+        ok &= agree >= min_agreement
+    return ok
+
+
+# ------------------------------------------------------------------
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Export the Keras model to TFLite / ONNX and check parity.")
+    ap.add_argument("--model", type=Path, default=MODEL_PATH)
+    ap.add_argument("--formats", nargs="+", choices=EXPORTERS, default=list(EXPORTERS))
+    ap.add_argument("--samples", type=Path, help="folder of sample images for the parity check")
+    ap.add_argument("--limit", type=int, default=128, help="max sample images")
+    ap.add_argument("--min-agreement", type=float, default=0.99, help="required top-1 agreement")
+    ap.add_argument("--parity-only", action="store_true", help="skip exporting, only compare")
+    ap.add_argument("--no-parity", action="store_true", help="skip the parity check")
+    args = ap.parse_args()
+    if args.samples is None and not args.no_parity:
+        ap.error("the parity check needs real images: pass --samples <dir> (or --no-parity)")
+
+    model = tf.keras.models.load_model(args.model, compile=False)
+    if not args.parity_only:
+        for fmt in args.formats:
+            out = args.model.with_suffix(SUFFIXES[fmt])
+            {"tflite": export_tflite, "onnx": export_onnx, "onnx-mmap": export_onnx_mmap}[fmt](model, out)
+            print(f"[✓] wrote {out.name} ({out.stat().st_size / 2**20:.1f} MB)", file=sys.stderr)
+    if args.no_parity:
+        return
+
+    backends = {fmt: load_backend(fmt, args.model) for fmt in args.formats}
+    x = load_samples(args.samples, args.limit, model.input_shape[1:])
+    if not check_parity(KerasBackend(model), backends, x, args.min_agreement):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
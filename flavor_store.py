@@ -0,0 +1,131 @@
+"""flavor_store.py
+----------------------------------
+Per-species Pokédex flavor text, deduplicated and interned at load.
+
+Usage::
+
+    flavor = FlavorStore.load(FLAVOR_PATH)
+    flavor.json("pikachu")               # b'["When several of ...", ...]'
+    flavor.json("pikachu", first=True)   # b'["When several of ..."]'
+    flavor.report()                      # {"lines": 8502, "unique": 7767, "saved_bytes": ...}
+
+``flavor_text.json`` repeats each entry once per game, mostly differing only
+in case (``"POKéMON"`` vs ``"Pokémon"``) or line breaks.  Lines that are
+equal after collapsing whitespace and case-folding count as one; the first
+variant is kept, with its whitespace collapsed, so ``first`` is still the
+line the client used to read as ``flavor[name][0]``.
+
+Each distinct line is JSON-encoded once into one shared buffer, and a
+species is only a run of line ids in a flat array, so text shared between
+forms is stored once too, with no per-line object overhead.
+:meth:`FlavorStore.report` gives the counts and the bytes saved against
+keeping every species' list as encoded JSON.
+"""
+from __future__ import annotations
+
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from dex_store import encode
+from usage_store import file_version, iter_json_items, normalize_key
+
+__all__ = ["FlavorStore", "fold"]
+
+
+def fold(line: str) -> str:
+    """Dedup key: whitespace collapsed, case-folded."""
+    return " ".join(line.split()).casefold()
+
+
+class FlavorStore:
+    """Read-only flavor-text lists by slug, matched like usage keys (:func:`usage_store.normalize_key`).
+
+    Parameters
+    ----------
+    raw: Mapping[str, list] | Iterable[tuple[str, list]]
+        ``flavor_text.json`` contents, slug -> list of lines.
+    """
+
+    def __init__(self, raw: Union[Mapping[str, Any], Iterable[Tuple[str, Any]]]) -> None:
+        lines_out: List[bytes] = []  # each distinct line, JSON-encoded once
+        line_ids: Dict[str, int] = {}
+        self._ids = array("I")       # every species' line ids, back to back
+        self._spans = array("I", [0])  # species k owns _ids[_spans[k]:_spans[k + 1]]
+        self._slot: Dict[str, int] = {}
+        self._counts = {"lines": 0, "json_bytes": 0, "json_heap": 0}
+
+        for slug, lines in raw.items() if isinstance(raw, Mapping) else raw:
+            lines = [l for l in lines if isinstance(l, str)] if isinstance(lines, list) else []
+            old = encode(lines)
+            self._counts["lines"] += len(lines)
+            self._counts["json_bytes"] += len(old)
+            self._counts["json_heap"] += sys.getsizeof(old)
+            own: List[int] = []
+            for line in lines:
+                key = fold(line)
+                i = line_ids.get(key)
+                if i is None:
+                    i = line_ids[key] = len(lines_out)
+                    lines_out.append(encode(" ".join(line.split())))
+                if i not in own:
+                    own.append(i)
+            self._slot[normalize_key(slug)] = len(self._spans) - 1
+            self._ids.extend(own)
+            self._spans.append(len(self._ids))
+
+        self._report: Optional[Dict[str, int]] = None
+        self._text = b"".join(lines_out)
+        self._offsets = array("I", [0])
+        for b in lines_out:
+            self._offsets.append(self._offsets[-1] + len(b))
+
+    version = ""  # content hash of the file it was loaded from
+
+    @classmethod
+    def load(cls, path: Path) -> "FlavorStore":
+        store = cls(iter_json_items(path))
+        store.version = file_version(path)
+        return store
+
+    def __len__(self) -> int:
+        return len(self._slot)
+
+    def slugs(self) -> List[str]:
+        return list(self._slot)
+
+    def json(self, slug: str, first: bool = False) -> Optional[bytes]:
+        """The species' distinct lines as a JSON list (just the first with ``first``)."""
+        k = self._slot.get(normalize_key(slug))
+        if k is None:
+            return None
+        lo, hi = self._spans[k], self._spans[k + 1]
+        ids = self._ids[lo:min(hi, lo + 1) if first else hi]
+        text, off = self._text, self._offsets
+        return b"[" + b",".join(text[off[i]:off[i + 1]] for i in ids) + b"]"
+
+    def get(self, slug: str) -> Optional[bytes]:
+        """Same as :meth:`json`; lets the store stand in for the old slug -> bytes dict."""
+        return self.json(slug)
+
+    def report(self) -> Dict[str, int]:
+        """Line counts, and bytes held vs. the old one-encoded-list-per-species dict."""
+        if self._report is not None:
+            return self._report
+        stored = len(self._text) + sum(a.itemsize * len(a) for a in (self._offsets, self._ids, self._spans))
+        heap = sum(map(sys.getsizeof, (self._text, self._offsets, self._ids, self._spans)))
+        served = sum(len(self.json(s)) for s in self._slot)
+        self._report = {
+            "species": len(self),
+            "lines": self._counts["lines"],
+            "kept": len(self._ids),
+            "unique": len(self._offsets) - 1,
+            "json_bytes": self._counts["json_bytes"],
+            "stored_bytes": stored,
+            "saved_bytes": self._counts["json_bytes"] - stored,
+            "response_bytes_saved": self._counts["json_bytes"] - served,
+            "heap_bytes": heap,
+            "heap_saved": self._counts["json_heap"] - heap,
+        }
+        return self._report
@@ -0,0 +1,451 @@
+"""inference.py
+----------------------------------
+Inference backends for the Pokédex classifier.
+
+Every backend exposes the same two calls so the server (and the
+micro-batcher) never cares what is doing the math::
+
+    backend = load_backend("tf-function", MODEL_PATH)
+    backend.warmup()                    # trace / allocate before traffic
+    probs = backend.predict(batch)      # (N, 224, 224, 3) -> (N, classes)
+
+Backends
+--------
+``keras``
+    The original ``model.predict(..., verbose=0)`` path.  Builds a data
+    adapter and callback list on every call – kept for comparison only.
+``tf-function`` (default)
+    A ``tf.function`` forward pass with one fixed input signature per padded
+    batch bucket (1, 2, 4, … 32).  Batches are zero-padded up to the next
+    bucket, so nothing is ever retraced after :meth:`warmup`.
+``tflite``
+    ``pokedex_resnet50.tflite`` on the TFLite interpreter + XNNPACK delegate,
+    multi-threaded (``INFER_THREADS``, default all cores).
+``tflite-dynamic`` / ``tflite-int8``
+    Dynamic-range and full-integer INT8 variants from ``quantize_model.py``.
+    Refused at load unless their accuracy report, scored on at least
+    ``QUANT_MIN_SAMPLES`` labelled photos, is within ``QUANT_MAX_DROP``.
+``onnx``
+    ``pokedex_resnet50.onnx`` on ONNX Runtime's CPU execution provider.
+``onnx-mmap``
+    Same runtime, but the weights are memory-mapped read-only from
+    ``pokedex_resnet50.weights.bin`` so every worker on a host shares one
+    copy of them.
+
+The ``.tflite`` / ``.onnx`` / ``.mmap.onnx`` artefacts are produced from the ``.h5`` by
+``export_model.py``, which also checks top-1 parity against Keras.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Sequence, Tuple
+
+import numpy as np
+
+__all__ = [
+    "Backend",
+    "KerasBackend",
+    "BucketedBackend",
+    "TFFunctionBackend",
+    "TFLiteBackend",
+    "OnnxBackend",
+    "MmapOnnxBackend",
+    "BACKENDS",
+    "BATCH_BUCKETS",
+    "load_backend",
+    "check_accuracy_gate",
+    "check_web_model",
+    "map_weights",
+]
+
+BATCH_BUCKETS: Tuple[int, ...] = (1, 2, 4, 8, 16, 32)
+QUANT_MAX_DROP = float(os.getenv("QUANT_MAX_DROP", "0.01"))  # allowed top-1 loss
+QUANT_MIN_SAMPLES = int(os.getenv("QUANT_MIN_SAMPLES", "200"))  # labelled eval images a report needs
+
+
+class Backend:
+    """Common interface – subclasses implement :meth:`predict`."""
+
+    name = "base"
+    input_shape: Tuple[int, ...] = (224, 224, 3)
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def warmup(self) -> None:
+        """Run a dummy batch so the first real request pays no setup cost."""
+        self.predict(np.zeros((1, *self.input_shape), np.float32))
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.name}>"
+
+
+class KerasBackend(Backend):
+    """Plain ``model.predict`` – the pre-backend behaviour."""
+
+    name = "keras"
+
+    def __init__(self, model) -> None:
+        self.model = model
+        self.input_shape = tuple(model.input_shape[1:])
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return self.model.predict(batch, verbose=0)
+
+
+class BucketedBackend(Backend):
+    """Backend that only ever sees a fixed set of batch shapes.
+
+    A batch of ``n`` runs on the smallest bucket ``>= n`` (zero-padded, then
+    sliced back); batches beyond the largest bucket are chunked.  Subclasses
+    implement :meth:`_forward` for exactly-bucket-sized inputs.
+    """
+
+    buckets: Tuple[int, ...] = BATCH_BUCKETS
+
+    def _forward(self, x: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def _bucket(self, n: int) -> int:
+        return next(b for b in self.buckets if b >= n)
+
+    def _run(self, chunk: np.ndarray) -> np.ndarray:
+        n = len(chunk)
+        size = self._bucket(n)
+        if size != n:
+            padded = np.zeros((size, *self.input_shape), np.float32)
+            padded[:n] = chunk
+            chunk = padded
+        return self._forward(np.asarray(chunk, np.float32))[:n]
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        top = self.buckets[-1]
+        if len(batch) <= top:
+            return self._run(batch)
+        return np.concatenate([self._run(batch[i:i + top]) for i in range(0, len(batch), top)])
+
+    def warmup(self) -> None:
+        for n in self.buckets:
+            self._forward(np.zeros((n, *self.input_shape), np.float32))
+
+
+class TFFunctionBackend(BucketedBackend):
+    """Graph-mode forward pass with pre-traced, fixed-shape signatures.
+
+    Parameters
+    ----------
+    model: tf.keras.Model
+        The loaded classifier.
+    buckets: Sequence[int]
+        Batch sizes to trace, one concrete function each.
+    """
+
+    name = "tf-function"
+
+    def __init__(self, model, buckets: Sequence[int] = BATCH_BUCKETS) -> None:
+        import tensorflow as tf
+
+        self.model = model
+        self.input_shape = tuple(model.input_shape[1:])
+        self.buckets = tuple(sorted(set(buckets)))
+
+        forward = tf.function(lambda x: model(x, training=False))
+        self._fns: Dict[int, Callable] = {
+            n: forward.get_concrete_function(tf.TensorSpec((n, *self.input_shape), tf.float32))
+            for n in self.buckets
+        }
+
+    def _forward(self, x: np.ndarray) -> np.ndarray:
+        return self._fns[len(x)](x).numpy()
+
+
+class TFLiteBackend(BucketedBackend):
+    """TensorFlow Lite interpreters with the XNNPACK CPU delegate.
+
+    Uses ``ai_edge_litert`` / ``tflite_runtime`` when installed (a few MB
+    instead of all of TensorFlow) and falls back to ``tf.lite``.  XNNPACK is applied by the
+    default op resolver for float models.  Each batch bucket gets its own
+    interpreter, resized and allocated once, so switching buckets never
+    re-plans tensors.  They are created on first use – every interpreter
+    packs its own copy of the weights – so a worker only pays for the
+    buckets its traffic reaches; warm-up builds the smallest.  Interpreters
+    are not thread-safe, so calls are serialised – the micro-batcher is the
+    only caller in practice anyway.
+
+    Parameters
+    ----------
+    model_path: Path
+        ``.tflite`` flatbuffer produced by ``export_model.py tflite``.
+    num_threads: int | None
+        Interpreter/XNNPACK thread count (default: all cores).
+    buckets: Sequence[int]
+        Batch sizes to run at, one interpreter each.
+    """
+
+    name = "tflite"
+
+    def __init__(self, model_path: Path, num_threads: int | None = None,
+                 buckets: Sequence[int] = BATCH_BUCKETS) -> None:
+        try:
+            from ai_edge_litert.interpreter import Interpreter
+        except ImportError:  # pragma: no cover – optional dep
+            try:
+                from tflite_runtime.interpreter import Interpreter  # type: ignore[no-redef]
+            except ImportError:
+                import tensorflow as tf
+
+                Interpreter = tf.lite.Interpreter
+
+        self._model = Path(model_path).read_bytes()  # one flatbuffer shared by every interpreter
+        self._new = lambda: Interpreter(model_content=self._model, num_threads=num_threads or os.cpu_count())
+        self.buckets = tuple(sorted(set(buckets)))
+        self._interps: Dict[int, Any] = {}
+        probe = self._new()
+        inp = probe.get_input_details()[0]
+        self._in = inp["index"]
+        self._out = probe.get_output_details()[0]["index"]
+        self.input_shape = tuple(int(d) for d in inp["shape"][1:])
+        self._lock = threading.Lock()
+
+    def _interp(self, n: int):
+        interp = self._interps.get(n)
+        if interp is None:
+            interp = self._new()
+            interp.resize_tensor_input(self._in, (n, *self.input_shape), strict=False)
+            interp.allocate_tensors()
+            self._interps[n] = interp
+        return interp
+
+    def _forward(self, x: np.ndarray) -> np.ndarray:
+        with self._lock:
+            interp = self._interp(len(x))
+            interp.set_tensor(self._in, x)
+            interp.invoke()
+            return interp.get_tensor(self._out).copy()
+
+    def warmup(self) -> None:
+        self._forward(np.zeros((self.buckets[0], *self.input_shape), np.float32))
+
+
+class OnnxBackend(Backend):
+    """ONNX Runtime CPU execution provider.
+
+    The exported graph has a dynamic batch axis and ``InferenceSession.run``
+    is thread-safe, so batches go straight through without padding.
+
+    Parameters
+    ----------
+    model_path: Path
+        ``.onnx`` file produced by ``export_model.py onnx``.
+    num_threads: int | None
+        Intra-op thread count (default: ONNX Runtime's own choice).
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path: Path, num_threads: int | None = None) -> None:
+        ort = _import_ort()
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._open(ort, model_path, opts, num_threads)
+
+    def _open(self, ort, model_path: Path, opts, num_threads: int | None) -> None:
+        if num_threads:
+            opts.intra_op_num_threads = num_threads
+        self._sess = ort.InferenceSession(str(model_path), opts, providers=["CPUExecutionProvider"])
+        inp = self._sess.get_inputs()[0]
+        self._in = inp.name
+        self.input_shape = tuple(int(d) for d in inp.shape[1:])
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return self._sess.run(None, {self._in: np.asarray(batch, np.float32)})[0]
+
+
+class MmapOnnxBackend(OnnxBackend):
+    """ONNX Runtime over weights memory-mapped from a flat file.
+
+    Every initializer is handed to the session as a read-only view into
+    ``pokedex_resnet50.weights.bin`` (see :func:`map_weights`), so all
+    workers on a host share one page-cache copy of the weights instead of
+    each holding ~100 MB of its own.  The graph was already optimised by
+    ``export_model.py onnx-mmap``; online optimisation and weight
+    pre-packing are switched off here because both would copy the weights
+    into private buffers again.
+
+    Parameters
+    ----------
+    graph_path: Path
+        Weight-less ``.mmap.onnx`` graph whose initializers point at
+        ``weights_path``.
+    weights_path: Path
+        Flat weights file written alongside it.
+    num_threads: int | None
+        Intra-op thread count (default: ONNX Runtime's own choice).
+    """
+
+    name = "onnx-mmap"
+
+    def __init__(self, graph_path: Path, weights_path: Path, num_threads: int | None = None) -> None:
+        ort = _import_ort()
+        self.weights = map_weights(weights_path)
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        opts.add_session_config_entry("session.disable_prepacking", "1")
+        # the session borrows these buffers, so they must outlive it
+        self._values = {n: ort.OrtValue.ortvalue_from_numpy(a) for n, a in self.weights.items()}
+        for n, v in self._values.items():
+            opts.add_initializer(n, v)
+        self._open(ort, graph_path, opts, num_threads)
+        mb = sum(a.nbytes for a in self.weights.values()) / 2**20
+        print(f"[✓] {len(self.weights)} tensors ({mb:.1f} MB) mapped from {Path(weights_path).name}",
+              file=sys.stderr)
+
+
+# ------------------------------------------------------------------
+def _import_ort():
+    try:
+        import onnxruntime as ort
+    except ImportError as exc:  # pragma: no cover – optional dep
+        raise ImportError("onnxruntime must be installed: `pip install onnxruntime`") from exc
+    return ort
+
+
+# Flat weights file: little-endian uint64 header length, a JSON header
+# ``{name: {"dtype", "shape", "offset"}}`` (offsets from the start of the
+# file), then the raw C-ordered arrays, each starting on a WEIGHTS_ALIGN
+# boundary.  The .mmap.onnx graph records the same offsets as ONNX external
+# data, so stock ONNX Runtime can still load the pair without mapping.
+WEIGHTS_ALIGN = 64
+
+
+def weights_path(model_path: Path) -> Path:
+    return model_path.with_suffix(".weights.bin")
+
+
+def map_weights(path: Path) -> Dict[str, np.ndarray]:
+    """Read-only ``np.ndarray`` views of every tensor in a flat weights file.
+
+    The file is mapped shared and read-only, so the pages come from the
+    page cache and are shared by every process mapping the same file.
+    """
+    mm = np.memmap(path, np.uint8, mode="r")
+    n = int(mm[:8].view("<u8")[0])
+    header = json.loads(mm[8:8 + n].tobytes())
+    out: Dict[str, np.ndarray] = {}
+    for name, t in header.items():
+        dtype = np.dtype(t["dtype"])
+        size = int(np.prod(t["shape"], dtype=np.int64)) * dtype.itemsize
+        out[name] = mm[t["offset"]:t["offset"] + size].view(dtype).reshape(t["shape"])
+    return out
+
+
+def _load_keras_model(model_path: Path):
+    import tensorflow as tf
+
+    return tf.keras.models.load_model(model_path, compile=False)
+
+
+def _threads() -> int | None:
+    return int(os.environ["INFER_THREADS"]) if os.getenv("INFER_THREADS") else None
+
+
+def quant_report_path(artefact: Path) -> Path:
+    return artefact.with_name(artefact.name + ".report.json")
+
+
+def artefact_digest(path: Path) -> str:
+    """sha256 of a model file; for a TF-JS folder, of its ``model.json``.
+
+    Only ``model.json`` is hashed for TF-JS because the shards aren't in
+    every checkout (the Pages deploy leaves them out).  The manifest holds
+    the per-tensor quantization parameters, so a re-quantized model still
+    gets a new hash.
+    """
+    path = Path(path)
+    h = hashlib.sha256()
+    with (path / "model.json" if path.is_dir() else path).open("rb") as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def check_accuracy_gate(artefact: Path, max_drop: float | None = None) -> Dict:
+    """Refuse a quantized artefact without a passing accuracy report.
+
+    ``quantize_model.py`` writes ``<artefact>.report.json`` holding the
+    artefact's sha256 (:func:`artefact_digest`) and its top-1 drop against the float model.  The
+    artefact is only accepted when the hash still matches, the drop was
+    measured on at least ``QUANT_MIN_SAMPLES`` class-labelled images (not
+    synthetic tensors or the float model's own guesses) and it is within
+    ``max_drop`` (default ``QUANT_MAX_DROP``).
+    """
+    budget = QUANT_MAX_DROP if max_drop is None else max_drop
+    report_path = quant_report_path(artefact)
+    if not report_path.exists():
+        raise RuntimeError(f"{artefact.name}: no accuracy report, run quantize_model.py first")
+    report = json.loads(report_path.read_text("utf-8"))
+    if report.get("sha256") != artefact_digest(artefact):
+        raise RuntimeError(f"{artefact.name}: accuracy report is for a different file")
+    if not (report.get("labelled") and report.get("reference") == "labels" and report.get("eval_source")):
+        raise RuntimeError(f"{artefact.name}: accuracy report was not scored on labelled images, "
+                           "re-run quantize_model.py with --eval <eval>/<ClassName>/*.jpg")
+    if report.get("variant") == "int8" and not report.get("calib_source"):
+        raise RuntimeError(f"{artefact.name}: accuracy report does not say what it was calibrated on")
+    if report.get("samples", 0) < QUANT_MIN_SAMPLES:
+        raise RuntimeError(f"{artefact.name}: accuracy report covers {report.get('samples', 0)} images, "
+                           f"at least {QUANT_MIN_SAMPLES} required")
+    drop = report["top1_drop"]
+    if drop > budget:
+        raise RuntimeError(f"{artefact.name}: top-1 drop {drop:.2%} exceeds budget {budget:.2%}")
+    print(f"[✓] {artefact.name}: top-1 drop {drop:.2%} within {budget:.2%} budget", file=sys.stderr)
+    return report
+
+
+def check_web_model(folder: Path, max_drop: float | None = None) -> Dict | None:
+    """:func:`check_accuracy_gate` for a TF-JS model folder, if its weights are quantized.
+
+    A float model (no ``quantization`` entry in ``model.json``) needs no
+    report and returns ``None``.  The Pages deploy runs this on ``web_model/``
+    so a quantized model is never published without a passing report.
+    """
+    manifest = json.loads((Path(folder) / "model.json").read_text("utf-8"))
+    quantized = any("quantization" in w for g in manifest.get("weightsManifest", []) for w in g.get("weights", []))
+    return check_accuracy_gate(Path(folder), max_drop) if quantized else None
+
+
+def _quantized_tflite(path: Path, name: str) -> TFLiteBackend:
+    check_accuracy_gate(path)
+    backend = TFLiteBackend(path, _threads())
+    backend.name = name
+    return backend
+
+
+# Factories take the Keras ``.h5`` path; converted backends look for their
+# artefact next to it (``pokedex_resnet50.tflite`` / ``.onnx`` /
+# ``.int8.tflite`` …).  Quantized variants must pass the accuracy gate.
+BACKENDS: Dict[str, Callable[[Path], Backend]] = {
+    "keras": lambda p: KerasBackend(_load_keras_model(p)),
+    "tf-function": lambda p: TFFunctionBackend(_load_keras_model(p)),
+    "tflite": lambda p: TFLiteBackend(p.with_suffix(".tflite"), _threads()),
+    "tflite-dynamic": lambda p: _quantized_tflite(p.with_suffix(".dynamic.tflite"), "tflite-dynamic"),
+    "tflite-int8": lambda p: _quantized_tflite(p.with_suffix(".int8.tflite"), "tflite-int8"),
+    "onnx": lambda p: OnnxBackend(p.with_suffix(".onnx"), _threads()),
+    "onnx-mmap": lambda p: MmapOnnxBackend(p.with_suffix(".mmap.onnx"), weights_path(p), _threads()),
+}
+
+
+def load_backend(name: str, model_path: Path | str) -> Backend:
+    """Instantiate backend ``name`` for the model at ``model_path``."""
+    try:
+        factory = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"unknown inference backend {name!r} (choose from {', '.join(BACKENDS)})") from None
+    print(f"[⇢] loading {name} backend from {Path(model_path).name}…", file=sys.stderr)
+    backend = factory(Path(model_path))
+    print(f"[✓] {name} backend ready", file=sys.stderr)
+    return backend
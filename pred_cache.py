@@ -0,0 +1,161 @@
+"""pred_cache.py
+----------------------------------
+LRU cache of model outputs keyed by the decoded 224×224 frame.
+
+Phones pointed at a static card or screen send long runs of identical or
+nearly identical frames.  :class:`PredictionCache` sits between decode and
+the micro-batcher and answers those without a forward pass::
+
+    cache = PredictionCache(capacity=1024, ttl=30, radius=4)
+    probs = cache.get(rgb)            # None on miss
+    if probs is None:
+        probs = batcher.predict(rgb)
+        cache.put(rgb, probs)
+
+Lookup is two-stage:
+
+1. exact – a 128-bit BLAKE2b digest of the decoded pixels;
+2. perceptual (``radius > 0``) – a 64-bit dHash of the frame, matched
+   against every live entry by Hamming distance ``<= radius``.
+
+Entries live in fixed slots (``uint64`` dHash, float32 probability rows),
+evicted LRU beyond ``capacity`` and ignored after ``ttl`` seconds.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+
+__all__ = ["PredictionCache", "dhash"]
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], np.uint8)
+
+
+def dhash(rgb: np.ndarray) -> int:
+    """64-bit difference hash: sign of horizontal gradients on a 9×8 thumbnail."""
+    g = np.asarray(Image.fromarray(rgb).convert("L").resize((9, 8), Image.BILINEAR), np.int16)
+    bits = (g[:, 1:] > g[:, :-1]).ravel()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+class PredictionCache:
+    """Bounded LRU/TTL cache of probability vectors.
+
+    Parameters
+    ----------
+    capacity: int
+        Maximum number of cached frames.
+    ttl: float
+        Seconds a cached prediction stays valid.
+    radius: int
+        Max dHash Hamming distance for a near-duplicate hit; 0 = exact only.
+    """
+
+    def __init__(self, capacity: int = 1024, ttl: float = 30.0, radius: int = 0) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1.")
+        self.capacity = capacity
+        self.ttl = ttl
+        self.radius = radius
+
+        self._dh = np.zeros(capacity, np.uint64)
+        self._live = np.zeros(capacity, bool)
+        self._born = np.zeros(capacity, np.float64)
+        self._probs: Optional[np.ndarray] = None  # (capacity, classes), sized on first put
+
+        self._slots: "OrderedDict[bytes, int]" = OrderedDict()  # digest -> slot, LRU first
+        self._digest: List[Optional[bytes]] = [None] * capacity
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+        self._lock = threading.Lock()
+
+        self.hits = self.near_hits = self.misses = self.evictions = self.expired = 0
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def digest(rgb: np.ndarray) -> bytes:
+        return hashlib.blake2b(np.ascontiguousarray(rgb).data, digest_size=16).digest()
+
+    def get(self, rgb: np.ndarray) -> Optional[np.ndarray]:
+        """Cached probabilities for ``rgb`` (or a near-duplicate), else ``None``."""
+        key = self.digest(rgb)
+        dh = dhash(rgb) if self.radius else 0
+        now = time.monotonic()
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is not None and self._fresh(slot, now):
+                self._slots.move_to_end(key)
+                self.hits += 1
+                return self._probs[slot].copy()
+            if self.radius:
+                slot = self._nearest(dh, now)
+                if slot is not None:
+                    self._slots.move_to_end(self._digest[slot])
+                    self.near_hits += 1
+                    return self._probs[slot].copy()
+            self.misses += 1
+            return None
+
+    def put(self, rgb: np.ndarray, probs: np.ndarray) -> None:
+        key = self.digest(rgb)
+        dh = dhash(rgb) if self.radius else 0
+        with self._lock:
+            if self._probs is None:
+                self._probs = np.zeros((self.capacity, len(probs)), np.float32)
+            slot = self._slots.get(key)
+            if slot is None:
+                if not self._free:
+                    _, old = self._slots.popitem(last=False)
+                    self._drop(old)
+                    self.evictions += 1
+                slot = self._free.pop()
+                self._slots[key] = slot
+                self._digest[slot] = key
+            else:
+                self._slots.move_to_end(key)
+            self._probs[slot] = probs
+            self._dh[slot] = dh
+            self._born[slot] = time.monotonic()
+            self._live[slot] = True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                "size": len(self._slots),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.near_hits) / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expired": self.expired,
+            }
+
+    # ------------------------------------------------------------------
+    def _fresh(self, slot: int, now: float) -> bool:
+        if now - self._born[slot] <= self.ttl:
+            return True
+        del self._slots[self._digest[slot]]
+        self._drop(slot)
+        self.expired += 1
+        return False
+
+    def _drop(self, slot: int) -> None:
+        self._live[slot] = False
+        self._digest[slot] = None
+        self._free.append(slot)
+
+    def _nearest(self, dh: int, now: float) -> Optional[int]:
+        live = np.flatnonzero(self._live & (now - self._born <= self.ttl))
+        if not live.size:
+            return None
+        xor = (self._dh[live] ^ np.uint64(dh)).view(np.uint8).reshape(-1, 8)
+        dist = _POPCOUNT[xor].sum(1)
+        best = int(dist.argmin())
+        return int(live[best]) if dist[best] <= self.radius else None
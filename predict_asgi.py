@@ -0,0 +1,462 @@
+"""predict_asgi.py
+----------------------------------
+ASGI variant of ``predict_server`` – same routes, same model, same caches.
+
+Run with::
+
+    uvicorn predict_asgi:app --host 0.0.0.0 --port 7860
+
+The Flask app ties up a thread per request for the whole decode + inference
+round trip, even after the phone has aborted the request and sent the next
+frame.  Here the event loop only waits: JPEG decode runs on a bounded
+thread pool (``ASGI_CPU_WORKERS``, default all cores) and inference goes
+through the shared micro-batcher.  Each request races its work against
+``http.disconnect``; when the client goes away first, the pending decode
+job or batcher future is cancelled, so an aborted frame that has not
+reached the model yet never will.
+
+``/api/stream`` is a WebSocket alternative to polling ``/api/predict``:
+the client sends each frame as a binary JPEG message and gets one JSON
+message back per frame the model ran on, tagged with the frame's ``seq``
+(its 0-based position in the stream).  Frames that arrive while the
+connection is busy wait in a queue of ``STREAM_QUEUE`` (default 1); when
+it is full the oldest is dropped, so a slow client always gets its newest
+frame next.  Stability history lives on the connection instead of in the
+shared per-client table.  ``?topk=N`` and ``?cache=0`` work as on
+``/api/predict``.
+
+Model loading, stability tracking and the prediction cache are the ones
+``predict_server`` builds (``MODEL_LOAD`` etc. apply unchanged).
+"""
+from __future__ import annotations
+
+import asyncio, hashlib, io, os, sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import IO, Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse, Response
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+import predict_server as ps
+
+CPU_WORKERS  = int(os.getenv("ASGI_CPU_WORKERS", "0")) or os.cpu_count() or 4
+STREAM_QUEUE = int(os.getenv("STREAM_QUEUE", "1"))   # frames held per connection
+
+# nginx's "client closed request"; nobody reads it, but it shows up in logs
+CLIENT_GONE = 499
+
+T = TypeVar("T")
+
+executor = ThreadPoolExecutor(CPU_WORKERS, thread_name_prefix="asgi-cpu")
+aborted = {"decode": 0, "inference": 0}
+streams = {"open": 0, "frames": 0, "dropped": 0, "predicted": 0}
+
+
+class ClientGone(Exception):
+    """The client disconnected before its result was ready."""
+
+
+class Superseded(Exception):
+    """A newer frame from the same client replaced this one in the queue."""
+
+
+class TooLarge(Exception):
+    """The request body is over ``MAX_UPLOAD_MB``."""
+
+
+# ---------- helpers ----------
+async def wait_disconnect(request: Request) -> None:
+    # only called once the body has been read, so the next message on the
+    # channel is the disconnect
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def unless_gone(request: Request, work: Awaitable[T]) -> T:
+    """Await ``work``; cancel it and raise :class:`ClientGone` on disconnect.
+
+    Raises :class:`Superseded` when the batcher cancelled ``work`` itself.
+    """
+    task = asyncio.ensure_future(work)
+    gone = asyncio.ensure_future(wait_disconnect(request))
+    try:
+        await asyncio.wait({task, gone}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        gone.cancel()
+    if not task.done():
+        task.cancel()  # propagates to the executor / batcher future
+        raise ClientGone
+    if task.cancelled():
+        raise Superseded
+    return task.result()
+
+
+def run_cpu(fn: Callable[..., T], *args: Any) -> "asyncio.Future[T]":
+    return asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+async def loaded(lazy: ps.Lazy[T]) -> T:
+    """``lazy.get()`` without blocking the loop on the first load."""
+    return lazy.get() if lazy.ready else await run_cpu(lazy.get)
+
+
+async def read_body(request: Request, limit: int) -> bytes:
+    """Read the body off the socket, raising :class:`TooLarge` past ``limit`` bytes.
+
+    Chunked uploads carry no ``Content-Length``, so the limit is enforced
+    while streaming.  ``request.body()`` / ``.form()`` / ``.json()`` then
+    parse this copy.
+    """
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise TooLarge
+        chunks.append(chunk)
+    request._body = body = b"".join(chunks)
+    return body
+
+
+async def read_image(request: Request) -> tuple[Optional[IO[bytes]], Dict[str, Any]]:
+    """Image stream plus the form / JSON fields sent with it (see ``ps.image_stream``)."""
+    mt = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if mt in ps.RAW_IMAGE_TYPES:
+        data = await request.body()
+        return (io.BytesIO(data) if data else None), {}
+    if mt == "multipart/form-data":
+        form = await request.form()
+        f = form.get("image")
+        return (io.BytesIO(await f.read()) if hasattr(f, "read") else None), dict(form)
+    try:
+        body = await request.json()
+    except ValueError:
+        body = {}
+    if not isinstance(body, dict):
+        raise ValueError("body must be a JSON object")
+    return ps.b64_image(body.get("image")), body
+
+
+def cache_allowed(request: Request | WebSocket) -> bool:
+    return (request.query_params.get("cache") != "0"
+            and "no-cache" not in request.headers.get("cache-control", ""))
+
+
+def topk_param(request: Request | WebSocket, fields: Dict[str, Any]) -> int:
+    raw = request.query_params.get("topk") or fields.get("topk")
+    try:
+        return max(0, min(int(raw or 0), ps.TOPK_MAX))
+    except (TypeError, ValueError):
+        return 0
+
+
+def client_id(request: Request) -> str:
+    return request.headers.get("x-client-id") or (request.client.host if request.client else "anon")
+
+
+# ---------- image classifier ----------
+async def predict(request: Request) -> Response:
+    length = request.headers.get("content-length") or "0"
+    if not (length.isascii() and length.isdigit()):
+        return JSONResponse({"error": "malformed Content-Length"}, 400)
+    if int(length) > ps.MAX_UPLOAD:
+        return JSONResponse({"error": "upload too large"}, 413)
+    try:
+        await read_body(request, ps.MAX_UPLOAD)
+        img, fields = await read_image(request)
+    except TooLarge:
+        return JSONResponse({"error": "upload too large"}, 413)
+    except ValueError as e:  # malformed JSON body or base64
+        return JSONResponse({"error": str(e)}, 400)
+    if img is None:
+        return JSONResponse({"error": "missing image"}, 400)
+    stage = "decode"
+    try:
+        rgb = await unless_gone(request, run_cpu(ps.preprocess, img))
+        use_cache = ps.pred_cache is not None and cache_allowed(request)
+        prob = ps.pred_cache.get(rgb) if use_cache else None
+        cached = prob is not None
+        if not cached:
+            stage = "inference"
+            model = await loaded(ps.MODEL)
+            fut = model.batcher.submit(rgb, key=request.headers.get("x-client-id"))
+            prob = await unless_gone(request, asyncio.wrap_future(fut))
+            if ps.pred_cache is not None:
+                ps.pred_cache.put(rgb, prob)
+        labels = await loaded(ps.IDX2NAME)
+        conf = float(prob.max())
+        name = labels.get(int(prob.argmax()), "Unknown")
+    except ClientGone:
+        aborted[stage] += 1
+        return Response(status_code=CLIENT_GONE)
+    except Superseded:
+        return JSONResponse(ps.SUPERSEDED, 409)
+    except OSError as e:
+        if stage == "decode":  # not an image, or truncated
+            return JSONResponse({"error": "could not decode image"}, 400)
+        return JSONResponse({"error": str(e)}, 500)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, 500)
+    # the shared tracker talks to its host over a socket: keep that off the loop
+    stable = await run_cpu(ps.tracker.update, client_id(request), prob)
+    out = {"name": name, "conf": round(conf, 4), "stable": stable, "cached": cached}
+    k = topk_param(request, fields)
+    if k:
+        out["topk"] = ps.top_k(prob, k)
+    return JSONResponse(out)
+
+
+async def stats(request: Request) -> Response:
+    model = ps.MODEL.get() if ps.MODEL.ready else None
+    stability = await run_cpu(ps.tracker.stats)
+    return JSONResponse({
+        "backend": model.backend.name if model else None,
+        "batcher": model.batcher.stats.snapshot() if model else None,
+        "startup": ps.startup_info(),
+        "stability": stability,
+        "cache": ps.pred_cache.stats() if ps.pred_cache is not None else None,
+        "aborted": dict(aborted),
+        "streams": dict(streams),
+        "data": ps.data_versions(),
+        "flavor": ps.flavor_report(),
+    })
+
+
+async def health(request: Request) -> Response:
+    return JSONResponse(ps.startup_info(), 200 if ps.is_ready() else 503)
+
+
+# ---------- streaming classifier ----------
+class FrameStream:
+    """Per-connection state: pending frames, stability history, options."""
+
+    def __init__(self, ws: WebSocket) -> None:
+        self.ws = ws
+        self.pending: deque = deque(maxlen=STREAM_QUEUE)  # (seq, jpeg); full -> oldest drops
+        self.wake = asyncio.Event()
+        self.seq = 0
+        self.tracker = ps.connection_tracker()
+        self.topk = topk_param(ws, {})
+        self.use_cache = ps.pred_cache is not None and cache_allowed(ws)
+
+    async def receive(self) -> None:
+        """Queue incoming frames until the client disconnects."""
+        while True:
+            msg = await self.ws.receive()
+            if msg["type"] == "websocket.disconnect":
+                return
+            data = msg.get("bytes")
+            if not data:
+                continue
+            if len(self.pending) == self.pending.maxlen:
+                streams["dropped"] += 1
+            self.pending.append((self.seq, data))
+            self.seq += 1
+            streams["frames"] += 1
+            self.wake.set()
+
+    async def run(self) -> None:
+        """Classify the oldest queued frame, send its result, repeat."""
+        while True:
+            await self.wake.wait()
+            if not self.pending:
+                self.wake.clear()
+                continue
+            seq, data = self.pending.popleft()
+            try:
+                out = await self.classify(data)
+            except Exception as e:  # noqa: BLE001 – report it, keep the stream open
+                out = {"error": str(e)}
+            try:
+                await self.ws.send_json({"seq": seq, **out})
+            except (WebSocketDisconnect, RuntimeError):  # client already gone
+                return
+
+    async def classify(self, data: bytes) -> Dict[str, Any]:
+        rgb = await run_cpu(ps.preprocess, io.BytesIO(data))
+        prob = ps.pred_cache.get(rgb) if self.use_cache else None
+        cached = prob is not None
+        if not cached:
+            model = await loaded(ps.MODEL)
+            prob = await asyncio.wrap_future(model.batcher.submit(rgb))
+            streams["predicted"] += 1
+            if ps.pred_cache is not None:
+                ps.pred_cache.put(rgb, prob)
+        labels = await loaded(ps.IDX2NAME)
+        out = {
+            "name": labels.get(int(prob.argmax()), "Unknown"),
+            "conf": round(float(prob.max()), 4),
+            "stable": await run_cpu(self.tracker.update, "ws", prob),
+            "cached": cached,
+        }
+        if self.topk:
+            out["topk"] = ps.top_k(prob, self.topk)
+        return out
+
+
+async def stream(ws: WebSocket) -> None:
+    await ws.accept()
+    conn = FrameStream(ws)
+    worker = asyncio.ensure_future(conn.run())
+    streams["open"] += 1
+    try:
+        await conn.receive()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        streams["open"] -= 1
+        worker.cancel()  # also cancels an in-flight batcher future
+
+
+# ---------- static files ----------
+async def static_file(request: Request) -> Response:
+    p = request.path_params.get("path") or "index.html"
+    if p.startswith("pointkedex/"):
+        p = p.split("/", 1)[1] or "index.html"
+    h = request.headers
+    hit = await run_cpu(ps.STATIC.respond, p, h.get("accept-encoding", ""),
+                        h.get("if-none-match", ""), request.query_params.get("v"))
+    if hit is None:  # missing (or outside ROOT)
+        return JSONResponse({"error": "not found"}, 404)
+    status, headers, body = hit
+    if isinstance(body, Path):  # not kept in memory: stream it
+        return FileResponse(body, headers=headers, media_type=headers.pop("Content-Type"))
+    return Response(body, status, headers)
+
+
+# ---------- pokédex stats ----------
+def cacheable_json(request: Request, body: bytes) -> Response:
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={ps.QUERY_MAX_AGE}"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+async def pokemon_query(request: Request) -> Response:
+    dex = await loaded(ps.POKEDEX)
+    try:
+        rows = dex.select(request.query_params)
+        offset, limit = ps.page_params(request.query_params)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, 400)
+    return cacheable_json(request, dex.page(rows, offset, limit))
+
+
+async def pokemon(request: Request) -> Response:
+    data = (await loaded(ps.DEX_ROWS)).json(request.path_params["slug"])
+    if data is None:
+        return JSONResponse({"error": "not found"}, 404)
+    return Response(data, media_type="application/json")
+
+
+# ---------- competitive usage ----------
+async def usage(request: Request) -> Response:
+    slug = request.path_params["slug"]
+    q = request.query_params
+    try:
+        data = (await loaded(ps.USAGE)).json(slug, q.get("tier"), q.get("fields"))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, 400)
+    if data is None:
+        print(f"[!] usage miss for slug='{slug}' normalized='{ps.normalize_key(slug)}'", file=sys.stderr)
+    return Response(data or b"{}", media_type="application/json")
+
+
+async def usage_tiers(request: Request) -> Response:
+    data = (await loaded(ps.USAGE)).tiers(request.path_params["slug"])
+    return Response(data or b'{"tiers":[],"sets":{}}', media_type="application/json")
+
+
+# ---------- flavor text ----------
+async def flavor(request: Request) -> Response:
+    first = request.query_params.get("first") in ("1", "true")
+    data = (await loaded(ps.FLAVOR)).json(request.path_params["slug"], first=first)
+    if data is None:
+        return JSONResponse({"error": "not found"}, 404)
+    return cacheable_json(request, data)
+
+
+# ---------- data reload ----------
+async def admin_reload(request: Request) -> Response:
+    if not ps.admin_allowed(request.headers.get("x-admin-token")):
+        return JSONResponse({"error": "forbidden"}, 403)
+    ps.reload_async()
+    return JSONResponse({"reloading": list(ps.DATA_SOURCES), "versions": ps.data_versions()}, 202)
+
+
+class DataVersion:
+    """Start this process's data watcher; tag HTTP responses with ``X-Data-Version``."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        ps.ensure_data_watcher()
+
+        async def tagged(msg: Dict) -> None:
+            if msg["type"] == "http.response.start":
+                v = ps.data_version_header()
+                if v:
+                    msg["headers"] = [*msg.get("headers", []), (b"x-data-version", v.encode())]
+            await send(msg)
+
+        await self.app(scope, receive, tagged)
+
+
+# ---------- batch lookup ----------
+async def batch(request: Request) -> Response:
+    if request.method == "POST":
+        try:
+            src = await request.json()
+        except ValueError:
+            src = None
+        if not isinstance(src, dict):
+            return JSONResponse({"error": "body must be a JSON object"}, 400)
+    else:
+        src = request.query_params
+    try:
+        slugs, parts = ps.lookup_request(src.get("slugs"), src.get("include"))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, 400)
+    for lazy in (ps.DEX_ROWS, ps.USAGE, ps.FLAVOR):
+        await loaded(lazy)
+    body = ps.lookup_body(slugs, parts)
+    if request.method == "GET":
+        return cacheable_json(request, body)
+    return Response(body, media_type="application/json")
+
+
+def _both(path: str, endpoint: Callable, route: type = Route, **kw: Any) -> list:
+    return [route(path, endpoint, **kw), route("/pointkedex" + path, endpoint, **kw)]
+
+
+routes = [
+    *_both("/api/predict", predict, methods=["POST"]),
+    *_both("/api/stream", stream, WebSocketRoute),
+    *_both("/api/stats", stats),
+    *_both("/api/health", health),
+    *_both("/api/pokemon", pokemon_query),
+    *_both("/api/pokemon/{slug}", pokemon),
+    *_both("/api/usage/{slug}", usage),
+    *_both("/api/usage/{slug}/tiers", usage_tiers),
+    *_both("/api/flavor/{slug}", flavor),
+    *_both("/api/batch", batch, methods=["GET", "POST"]),
+    *_both("/api/admin/reload", admin_reload, methods=["POST"]),
+    Route("/", static_file),
+    Route("/{path:path}", static_file),
+]
+
+app = Starlette(routes=routes, middleware=[
+    Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"],
+               expose_headers=["X-Data-Version"]),
+    Middleware(DataVersion),
+])
@@ -1,5 +1,5 @@
 import cv2, json, numpy as np, mss, tensorflow as tf
-from tensorflow.keras.applications.resnet50 import preprocess_input
+from preprocessing import caffe_preprocess
 import pyttsx3
 import random  # kept for future use
 
@@ -25,7 +25,7 @@ if WINDOW_TITLE:
         ROI = {"left": cx-128, "top": cy-128, "width": 256, "height": 256}
         print(f"[INFO] ROI autoconfig from “{WINDOW_TITLE}”: {ROI}")
     except Exception as e:
-        print(f"[WARN] window “{WINDOW_TITLE}” not found ({e}); using manual ROI)
+        print(f"[WARN] window “{WINDOW_TITLE}” not found ({e}); using manual ROI")
 
 # -----------------------------------------------------------------------------
 # Load model & label map
@@ -48,10 +48,12 @@ except FileNotFoundError:
 # -----------------------------------------------------------------------------
 # Helpers
 # -----------------------------------------------------------------------------
+_frame = np.empty((1, 224, 224, 3), np.float32)   # reused model input
+
 def preprocess_frame(bgra):
+    # mss frames are already BGR(A), which is what caffe mode wants – no flip
     img = cv2.resize(bgra, (224, 224))
-    img = cv2.cvtColor(img, cv2.COLOR_BGRA2RGB)
-    return preprocess_input(img)[None, ...]
+    return caffe_preprocess(img, out=_frame[0], order="BGRA")[None, ...]
 
 def speak_flavor(poke_name: str):
     """Speak the first English flavour‑text entry, if present."""
@@ -1,32 +1,155 @@
 from __future__ import annotations
 
-import base64, io, json, os, re, sys
-from collections import deque
+import time
+_T_IMPORT = time.perf_counter()  # start of the import-to-ready clock
+
+import argparse, base64, gc, hashlib, hmac, io, json, os, sys, threading
+from concurrent.futures import CancelledError
 from pathlib import Path
-from typing import Any, Dict, Tuple
+from typing import IO, Any, Callable, Dict, Generic, List, Optional, TypeVar
 
 os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
 os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
 
 import numpy as np
-import tensorflow as tf
-from PIL import Image
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Blueprint, Flask, Response, jsonify, request, send_file, send_from_directory
 from flask_cors import CORS
 
+from batcher import MicroBatcher
+from dex_store import PAGE_DEFAULT, DexStore
+from flavor_store import FlavorStore
+from inference import BACKENDS, load_backend
+from pred_cache import PredictionCache
+from preprocessing import BatchBuffer, decode_image
+from stability import make_tracker
+from static_assets import PRECOMPRESS, StaticAssets
+from usage_store import UsageStore, normalize_key
+
 ROOT        = Path(__file__).resolve().parent
 MODEL_PATH  = ROOT / "pokedex_resnet50.h5"
 LABEL_PATH  = ROOT / "class_indices.json"
 DEX_PATH    = ROOT / "pokedex_data.json"
 USAGE_PATH  = ROOT / "usage_data.json"
+USAGE_PACK  = ROOT / "usage_data.pack"   # python usage_pack.py; served instead of the JSON when present
+DATA_DB     = Path(os.getenv("DATA_DB", str(ROOT / "pointkedex.db")))  # python data_db.py; preferred when present
+FLAVOR_PATH = ROOT / "flavor_text.json"
 
 INPUT_SIZE  = (224, 224)
 THRESH_CONF = 0.20
 STABLE_CNT  = 3
 
-print("[⇢] loading model…", file=sys.stderr)
-model = tf.keras.models.load_model(MODEL_PATH, compile=False)
-print("[✓] model ready", file=sys.stderr)
+INFER_BACKEND = os.getenv("INFER_BACKEND", "tf-function")
+BATCH_MAX     = int(os.getenv("BATCH_MAX", "32"))       # bounded by concurrent requests (gunicorn --threads)
+BATCH_WAIT_MS = float(os.getenv("BATCH_WAIT_MS", "5"))
+MAX_UPLOAD    = int(os.getenv("MAX_UPLOAD_MB", "8")) * 2**20
+FAST_DECODE   = os.getenv("FAST_DECODE", "1") != "0"   # JPEG DCT-domain downscale
+
+STABILITY_STORE   = os.getenv("STABILITY_STORE", "local")   # local | shared (all workers)
+STABILITY_CLIENTS = int(os.getenv("STABILITY_MAX_CLIENTS", "4096"))
+STABILITY_TTL     = float(os.getenv("STABILITY_TTL", "300"))
+STABILITY_SOCKET  = os.getenv("STABILITY_SOCKET") or None   # default: private per-user runtime dir
+STABILITY_MODE    = os.getenv("STABILITY_MODE", "streak")   # streak | ema
+EMA_ALPHA         = float(os.getenv("EMA_ALPHA", "0.5"))
+EMA_THRESH        = float(os.getenv("EMA_THRESH", "0.35"))
+EMA_MIN_FRAMES    = int(os.getenv("EMA_MIN_FRAMES", "2"))
+
+TOPK_MAX = 20
+LOOKUP_MAX = 100   # slugs per /api/batch call
+LOOKUP_PARTS = ("dex", "usage", "flavor")
+QUERY_MAX_AGE = int(os.getenv("QUERY_MAX_AGE", "300"))  # Cache-Control for /api/pokemon?…
+
+CACHE_SIZE   = int(os.getenv("PRED_CACHE_SIZE", "1024"))    # 0 disables the cache
+CACHE_TTL    = float(os.getenv("PRED_CACHE_TTL", "30"))
+CACHE_RADIUS = int(os.getenv("PRED_CACHE_DHASH", "0"))     # dHash Hamming radius, 0 = exact only
+
+RAW_IMAGE_TYPES = {"image/jpeg", "image/webp", "image/png"}
+SUPERSEDED = {"error": "superseded by a newer frame", "skipped": True}
+
+# lazy:       model + data load on the first request that needs them
+# background: same, but a warm-up thread starts loading right away (default)
+# preload:    labels, data and static files load before create_app() returns;
+#             pair with `gunicorn --preload` so workers share them copy-on-write.
+#             The model is never built in the master – TF, XNNPACK and ONNX
+#             Runtime thread pools don't survive fork – each worker loads it
+#             right after the fork.  Use onnx-mmap to share the weights too
+#             (they live in the page cache).
+MODEL_LOAD = os.getenv("MODEL_LOAD", "background")
+LOAD_MODES = ("lazy", "background", "preload")
+
+DATA_WATCH_S = float(os.getenv("DATA_WATCH_S", "30"))  # data-file poll interval, 0 = off
+ADMIN_TOKEN  = os.getenv("ADMIN_TOKEN", "")            # unset disables /api/admin/reload
+
+if __name__ == "__main__":
+    _cli = argparse.ArgumentParser(description="Pointkedex prediction server")
+    _cli.add_argument("--backend", choices=list(BACKENDS), default=INFER_BACKEND,
+                      help="inference backend (env: INFER_BACKEND)")
+    _cli.add_argument("--load", choices=LOAD_MODES, default=MODEL_LOAD,
+                      help="when to load the model (env: MODEL_LOAD)")
+    _cli.add_argument("--port", type=int, default=int(os.getenv("PORT", 5000)))
+    ARGS = _cli.parse_args()
+    INFER_BACKEND = ARGS.backend
+    MODEL_LOAD = ARGS.load
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    """Value built by ``build()`` on first :meth:`get`, then cached.
+
+    Thread-safe: concurrent first callers block on one build.  Fork-safe:
+    a value built before a fork is inherited (that is the point of
+    preloading); a build that was still running in the parent is redone
+    in the child instead of waiting on a lock nobody will release.
+    """
+
+    def __init__(self, name: str, build: Callable[[], T]) -> None:
+        self.name = name
+        self._build = build
+        self._value: Optional[T] = None
+        self._ready = False
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def get(self) -> T:
+        if self._ready:
+            return self._value  # type: ignore[return-value]
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._lock = threading.Lock()
+        with self._lock:
+            if not self._ready:
+                self._value = self._build()
+                self._ready = True
+        return self._value  # type: ignore[return-value]
+
+    def reload(self) -> T:
+        """Build a fresh value and swap it in.
+
+        The build runs outside the lock; readers keep getting the old value
+        until the new one lands in a single reference assignment.
+        """
+        value = self._build()
+        self._value = value
+        self._ready = True
+        return value
+
+
+# ---------- model + data, built on first use ----------
+class Model:
+    """Backend plus the micro-batcher feeding it."""
+
+    def __init__(self, name: str) -> None:
+        self.backend = load_backend(name, MODEL_PATH)
+        self.backend.warmup()
+        print("[✓] model warmed up", file=sys.stderr)
+        self.batcher = MicroBatcher(self.backend.predict, max_batch=BATCH_MAX, max_wait_ms=BATCH_WAIT_MS,
+                                    prepare=BatchBuffer(BATCH_MAX, self.backend.input_shape).fill)
+        print(f"[✓] micro-batcher: ≤{BATCH_MAX} images / {BATCH_WAIT_MS:g} ms", file=sys.stderr)
+
 
 def load_labels() -> Dict[int, str]:
     raw = json.loads(LABEL_PATH.read_text("utf-8"))
@@ -36,92 +159,579 @@ def load_labels() -> Dict[int, str]:
         return {v: k for k, v in raw.items()}
     raise ValueError("class_indices.json schema unknown")
 
-IDX2NAME = load_labels()
-POKEDEX  = json.loads(DEX_PATH.read_text("utf-8"))
-_raw_usage = json.loads(USAGE_PATH.read_text("utf-8")) if USAGE_PATH.exists() else {}
 
-print(f"[✓] {len(IDX2NAME)} labels, {len(POKEDEX)} dex entries, {len(_raw_usage)} usage (raw)", file=sys.stderr)
+def file_stamp(path: Path) -> Optional[tuple]:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+_stamps: Dict[str, Optional[tuple]] = {}  # data file (mtime, size) as of its last load
+USE_DB = DATA_DB.exists()
+USAGE_SOURCE = DATA_DB if USE_DB else USAGE_PACK if USAGE_PACK.exists() else USAGE_PATH
+
+
+def load_pokedex() -> DexStore:
+    _stamps["pokedex"] = file_stamp(DEX_PATH)
+    dex = DexStore.load(DEX_PATH)
+    print(f"[✓] {len(dex)} dex entries, {len(dex.type_names)} types, {len(dex.abilities)} abilities",
+          file=sys.stderr)
+    return dex
+
+
+def load_usage() -> UsageStore:
+    _stamps["usage"] = file_stamp(USAGE_SOURCE)
+    if USE_DB:
+        from data_db import UsageDB
+
+        usage: UsageStore = UsageDB.open(DATA_DB)
+        print(f"[✓] {len(usage)} usage entries in {DATA_DB.name}", file=sys.stderr)
+        return usage
+    if USAGE_SOURCE == USAGE_PACK:
+        from usage_pack import UsagePack
+
+        usage = UsagePack.open(USAGE_PACK)
+        print(f"[✓] {len(usage)} usage entries mapped from {USAGE_PACK.name}", file=sys.stderr)
+        return usage
+    usage = UsageStore.load(USAGE_PATH)
+    print(f"[✓] {len(usage)} usage entries after normalization ({usage.raw_count} raw)", file=sys.stderr)
+    return usage
+
 
-_NORMALIZE_RE = re.compile(r"[^a-z0-9]+")
+def load_dex_rows() -> Any:
+    """Single-entry lookups from the data DB; queries still need the full :class:`DexStore`."""
+    from data_db import DexDB
 
+    _stamps["pokedex-db"] = file_stamp(DATA_DB)
+    dex = DexDB.open(DATA_DB)
+    print(f"[✓] {len(dex)} dex entries in {DATA_DB.name}", file=sys.stderr)
+    return dex
 
-def normalize_key(k: str) -> str:
-    return _NORMALIZE_RE.sub("", k.lower())
 
+def load_flavor() -> Any:
+    """Deduplicated flavor text, from the data DB when there is one."""
+    if USE_DB:
+        from data_db import FlavorDB
 
-USAGE = { normalize_key(k): v for k, v in _raw_usage.items() }
+        _stamps["flavor"] = file_stamp(DATA_DB)
+        flavor = FlavorDB.open(DATA_DB)
+        print(f"[✓] flavor text for {len(flavor)} species in {DATA_DB.name}", file=sys.stderr)
+        return flavor
+    _stamps["flavor"] = file_stamp(FLAVOR_PATH)
+    flavor = FlavorStore.load(FLAVOR_PATH)
+    r = flavor.report()
+    print(f"[✓] flavor text for {r['species']} species: {r['lines']} lines -> {r['unique']} unique, "
+          f"{r['heap_saved'] / 1024:.0f} KiB memory / {r['response_bytes_saved'] / 1024:.0f} KiB response bytes saved",
+          file=sys.stderr)
+    return flavor
 
-print(f"[✓] {len(USAGE)} usage entries after normalization", file=sys.stderr)
 
-app = Flask(__name__, static_folder=str(ROOT))
-CORS(app)
+MODEL    = Lazy("model", lambda: Model(INFER_BACKEND))
+IDX2NAME = Lazy("labels", load_labels)
+POKEDEX  = Lazy("pokedex", load_pokedex)
+USAGE    = Lazy("usage", load_usage)
+FLAVOR   = Lazy("flavor", load_flavor)
+DEX_ROWS = Lazy("pokedex-db", load_dex_rows) if USE_DB else POKEDEX  # /api/pokemon/<slug>, /api/batch
 
-_recent: Dict[str, deque[Tuple[int, float]]] = {}
+# hot-reloadable data: swapped in place when its file changes
+DATA_SOURCES = {"pokedex": (POKEDEX, DEX_PATH), "usage": (USAGE, USAGE_SOURCE)}
+DATA_SOURCES["flavor"] = (FLAVOR, DATA_DB if USE_DB else FLAVOR_PATH)
+if USE_DB:
+    DATA_SOURCES["pokedex-db"] = (DEX_ROWS, DATA_DB)
+_reload_lock = threading.Lock()
+_watch_lock = threading.Lock()
+_watch_pid: Optional[int] = None
+
+
+def reload_data(force: bool = False) -> Dict[str, str]:
+    """Rebuild each loaded data store whose file changed (every one with ``force``).
+
+    Parsing happens off to the side and the finished store is swapped in
+    atomically, so requests never wait on a reload.  A file that fails to
+    parse leaves the current store in place.  Returns ``{name: version}``
+    for the stores whose content changed.
+    """
+    swapped: Dict[str, str] = {}
+    with _reload_lock:
+        for name, (lazy, path) in DATA_SOURCES.items():
+            if not lazy.ready or (not force and file_stamp(path) == _stamps.get(name)):
+                continue
+            old = lazy.get().version
+            try:
+                new = lazy.reload().version
+            except Exception as e:  # noqa: BLE001 – keep serving the old data
+                print(f"[!] {name} reload failed, keeping {old}: {e}", file=sys.stderr)
+                continue
+            if new != old:
+                swapped[name] = new
+                print(f"[✓] {name} reloaded: {old} -> {new} (pid {os.getpid()})", file=sys.stderr)
+    if swapped:
+        STATIC.clear()  # the raw JSON files are served statically too
+    return swapped
+
+
+def _watch_data() -> None:
+    while True:
+        time.sleep(DATA_WATCH_S)
+        reload_data()
+
+
+def ensure_data_watcher() -> None:
+    """Poll the data files from this process (again after a fork).
+
+    Every worker watches the same files, so all of them converge on
+    whatever is on disk within ``DATA_WATCH_S`` seconds.
+    """
+    global _watch_pid
+    if DATA_WATCH_S <= 0 or _watch_pid == os.getpid():
+        return
+    with _watch_lock:
+        if _watch_pid == os.getpid():
+            return
+        _watch_pid = os.getpid()
+        threading.Thread(target=_watch_data, name="data-watch", daemon=True).start()
+
+
+def data_versions() -> Dict[str, Optional[str]]:
+    """Content hash of each loaded data store (``None`` until first use)."""
+    return {name: lazy.get().version if lazy.ready else None for name, (lazy, _) in DATA_SOURCES.items()}
+
+
+def data_version_header() -> str:
+    """``X-Data-Version`` value, e.g. ``pokedex=1a2b3c4d5e6f; usage=none``."""
+    return "; ".join(f"{k}={v}" for k, v in data_versions().items() if v)
+
+_ready_s: Optional[float] = None
+_mode = MODEL_LOAD  # the load mode create_app() ran with
+
+
+def warm_up() -> None:
+    """Load the model and labels now and log the import-to-ready time."""
+    global _ready_s
+    try:
+        MODEL.get()
+        IDX2NAME.get()
+    except Exception as e:  # noqa: BLE001 – requests will retry the load and report it
+        print(f"[!] warm-up failed: {e}", file=sys.stderr)
+        return
+    if _ready_s is None:
+        _ready_s = time.perf_counter() - _T_IMPORT
+        print(f"[✓] ready {_ready_s:.2f}s after import (pid {os.getpid()}, {MODEL_LOAD})", file=sys.stderr)
+
+
+def warm_up_all() -> None:
+    """:func:`warm_up`, then precompress the big static files."""
+    warm_up()
+    STATIC.warm(PRECOMPRESS)
+
+
+def is_ready() -> bool:
+    """Lazy mode is ready once the app exists; the others once the model is loaded."""
+    return MODEL.ready or (_mode == "lazy" and _ready_s is not None)
+
+
+def warm_up_async() -> threading.Thread:
+    """Start :func:`warm_up_all` on a daemon thread and return it."""
+    t = threading.Thread(target=warm_up_all, name="warm-up", daemon=True)
+    t.start()
+    return t
+
+
+STATIC = StaticAssets(ROOT)
+pred_cache = PredictionCache(CACHE_SIZE, CACHE_TTL, CACHE_RADIUS) if CACHE_SIZE > 0 else None
+
+if STABILITY_MODE == "ema":
+    _rule = (EMA_ALPHA, EMA_THRESH, EMA_MIN_FRAMES)
+else:
+    _rule = (STABLE_CNT, THRESH_CONF)
+tracker = make_tracker(STABILITY_STORE, STABILITY_MODE, *_rule, max_clients=STABILITY_CLIENTS,
+                       ttl=STABILITY_TTL, address=STABILITY_SOCKET)
 cid = lambda: request.headers.get("X-Client-ID", request.remote_addr or "anon")
 
+
+def connection_tracker():
+    """One-client tracker owned by a single streaming connection."""
+    return make_tracker("local", STABILITY_MODE, *_rule, max_clients=1, ttl=STABILITY_TTL)
+
+api = Blueprint("pointkedex", __name__)
+
+
+@api.before_app_request
+def _start_watcher() -> None:
+    ensure_data_watcher()
+
+
+@api.after_app_request
+def _tag_data_version(resp: Response) -> Response:
+    v = data_version_header()
+    if v:
+        resp.headers["X-Data-Version"] = v
+    return resp
+
+
 # ---------- static files ----------
-@app.route("/")
+@api.route("/")
 def root() -> Any:
-    return send_from_directory(str(ROOT), "index.html")
+    return static_file("index.html")
 
 
-@app.route("/<path:p>")
+@api.route("/<path:p>")
 def static_file(p: str) -> Any:
     if p.startswith("pointkedex/"):
         p = p.split("/", 1)[1]
-    return send_from_directory(str(ROOT), p)
+    hit = STATIC.respond(p, request.headers.get("Accept-Encoding", ""),
+                         request.headers.get("If-None-Match", ""), request.args.get("v"))
+    if hit is None:  # missing (or outside ROOT)
+        return send_from_directory(str(ROOT), p)
+    status, headers, body = hit
+    if isinstance(body, Path):  # not kept in memory: stream it
+        resp = send_file(body, mimetype=headers.pop("Content-Type"), etag=False)
+        resp.headers.update(headers)
+        return resp
+    return Response(body, status, headers)
 
 
 # ---------- helpers ----------
-def preprocess(b64: str) -> np.ndarray:
-    if "," in b64:
-        b64 = b64.split(",", 1)[1]
-    rgb = Image.open(io.BytesIO(base64.b64decode(b64))).convert("RGB").resize(INPUT_SIZE)
-    arr = tf.keras.preprocessing.image.img_to_array(rgb)
-    arr = tf.keras.applications.resnet50.preprocess_input(arr)
-    return arr[None]
+def image_stream() -> Optional[IO[bytes]]:
+    """Uploaded image as a binary stream, whichever way the client sent it.
+
+    * raw ``image/jpeg|webp|png`` body – read once off the socket; the
+      ``BytesIO`` shares that buffer rather than copying it
+    * ``multipart/form-data`` with an ``image`` file part – werkzeug's
+      spooled upload is handed to PIL as-is
+    * legacy ``{"image": "<data-url or base64>"}`` JSON
+
+    Raises ``ValueError`` for a JSON body that isn't an object or an
+    ``image`` that isn't a string (or isn't valid base64).
+    """
+    mt = request.mimetype
+    if mt in RAW_IMAGE_TYPES:
+        data = request.get_data(cache=False)
+        return io.BytesIO(data) if data else None
+    if mt == "multipart/form-data":
+        f = request.files.get("image")
+        return f.stream if f else None
+    body = request.get_json(silent=True)
+    if body is None:
+        return None
+    if not isinstance(body, dict):
+        raise ValueError("body must be a JSON object")
+    return b64_image(body.get("image"))
+
+
+def b64_image(b64: Any) -> Optional[IO[bytes]]:
+    """The JSON ``image`` field (data URL or bare base64) as a stream."""
+    if not b64:
+        return None
+    if not isinstance(b64, str):
+        raise ValueError("'image' must be a base64 string or data URL")
+    return io.BytesIO(base64.b64decode(b64[b64.find(",") + 1:]))
+
+
+def preprocess(fp: IO[bytes]) -> np.ndarray:
+    """Decoded ``(224, 224, 3)`` uint8 RGB; the batcher normalises it."""
+    return np.asarray(decode_image(fp, INPUT_SIZE, fast=FAST_DECODE))
+
+
+def cache_allowed() -> bool:
+    """Clients opt out per request with ``?cache=0`` or ``Cache-Control: no-cache``."""
+    return request.args.get("cache") != "0" and "no-cache" not in request.headers.get("Cache-Control", "")
+
+
+def frame_key() -> Optional[str]:
+    """Latest-frame-wins key: only an explicit ``X-Client-ID``, never the IP.
+
+    Clients behind one NAT share an address and must not cancel each other.
+    """
+    return request.headers.get("X-Client-ID")
+
+
+def topk_param() -> int:
+    """``?topk=N`` (or a ``topk`` form / JSON field), clamped to ``TOPK_MAX``; 0 = off."""
+    raw = request.args.get("topk") or request.form.get("topk")
+    if raw is None and request.is_json:
+        raw = (request.get_json(silent=True) or {}).get("topk")
+    try:
+        return max(0, min(int(raw or 0), TOPK_MAX))
+    except (TypeError, ValueError):
+        return 0
+
+
+def top_k(prob: np.ndarray, k: int) -> List[Dict[str, Any]]:
+    """The ``k`` most likely classes, best first."""
+    k = min(k, len(prob))
+    part = np.argpartition(prob, -k)[-k:]
+    order = part[np.argsort(prob[part])[::-1]]
+    labels = IDX2NAME.get()
+    return [{"name": labels.get(int(i), "Unknown"), "conf": round(float(prob[i]), 4)} for i in order]
 
 
 # ---------- image classifier ----------
-@app.route("/api/predict", methods=["POST"])
-@app.route("/pointkedex/api/predict", methods=["POST"])
+@api.route("/api/predict", methods=["POST"])
+@api.route("/pointkedex/api/predict", methods=["POST"])
 def predict() -> Any:
-    img = (request.get_json(silent=True) or {}).get("image")
-    if not img:
+    try:
+        img = image_stream()
+    except ValueError as e:  # malformed JSON body or base64
+        return jsonify({"error": str(e)}), 400
+    if img is None:
         return jsonify({"error": "missing image"}), 400
     try:
-        prob = model.predict(preprocess(img), verbose=0)[0]
+        rgb = preprocess(img)
+    except OSError:  # not an image, or truncated (PIL.UnidentifiedImageError is an OSError)
+        return jsonify({"error": "could not decode image"}), 400
+    try:
+        prob = pred_cache.get(rgb) if pred_cache is not None and cache_allowed() else None
+        cached = prob is not None
+        if not cached:
+            prob = MODEL.get().batcher.predict(rgb, key=frame_key())
+            if pred_cache is not None:
+                pred_cache.put(rgb, prob)
         conf = float(prob.max())
         idx = int(prob.argmax())
-        name = IDX2NAME.get(idx, "Unknown")
+        name = IDX2NAME.get().get(idx, "Unknown")
+    except CancelledError:  # a newer frame from this client took its place
+        return jsonify(SUPERSEDED), 409
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    dq = _recent.setdefault(cid(), deque(maxlen=STABLE_CNT))
-    dq.append((idx, conf))
-    stable = len(dq) == STABLE_CNT and all(i == idx for i, _ in dq) and all(c >= THRESH_CONF for _, c in dq)
-    return jsonify({"name": name, "conf": round(conf, 4), "stable": stable})
+    stable = tracker.update(cid(), prob)
+    out = {"name": name, "conf": round(conf, 4), "stable": stable, "cached": cached}
+    k = topk_param()
+    if k:
+        out["topk"] = top_k(prob, k)
+    return jsonify(out)
+
+
+@api.route("/api/stats")
+@api.route("/pointkedex/api/stats")
+def stats() -> Any:
+    model = MODEL.get() if MODEL.ready else None
+    return jsonify({
+        "backend": model.backend.name if model else None,
+        "batcher": model.batcher.stats.snapshot() if model else None,
+        "startup": startup_info(),
+        "data": data_versions(),
+        "flavor": flavor_report(),
+        "stability": tracker.stats(),
+        "cache": pred_cache.stats() if pred_cache is not None else None,
+    })
+
+
+def flavor_report() -> Optional[Dict[str, int]]:
+    """Dedup savings of the in-memory flavor store, once it is loaded."""
+    store = FLAVOR.get() if FLAVOR.ready else None
+    return store.report() if isinstance(store, FlavorStore) else None
+
+
+def startup_info() -> Dict[str, Any]:
+    return {
+        "mode": _mode,
+        "ready": is_ready(),
+        "model_loaded": MODEL.ready,
+        "import_to_ready_s": round(_ready_s, 3) if _ready_s is not None else None,
+    }
+
+
+@api.route("/api/health")
+@api.route("/pointkedex/api/health")
+def health() -> Any:
+    """200 once the server can answer predictions, 503 while the model is still warming up.
+
+    In lazy mode that is as soon as the app exists: the model loads on the
+    first predict, which is the point of the mode.
+    """
+    return jsonify(startup_info()), 200 if is_ready() else 503
 
 
 # ---------- pokédex stats ----------
-@app.route("/api/pokemon/<slug>")
-@app.route("/pointkedex/api/pokemon/<slug>")
+def cacheable_json(body: bytes, max_age: int = QUERY_MAX_AGE) -> Any:
+    """``body`` with a strong ETag, or a 304 when the client already has it."""
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status=304, headers=headers)
+    return Response(body, mimetype="application/json", headers=headers)
+
+
+def page_params(args: Any) -> tuple[int, int]:
+    """``(offset, limit)`` from query args; ``ValueError`` when not integers."""
+    return int(args.get("offset", 0)), int(args.get("limit", PAGE_DEFAULT))
+
+
+@api.route("/api/pokemon")
+@api.route("/pointkedex/api/pokemon")
+def pokemon_query() -> Any:
+    """Filter / sort / page the whole dex, e.g. ``?type=water&min_speed=100&sort=-attack``."""
+    dex = POKEDEX.get()
+    try:
+        rows = dex.select(request.args)
+        offset, limit = page_params(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return cacheable_json(dex.page(rows, offset, limit))
+
+
+@api.route("/api/pokemon/<slug>")
+@api.route("/pointkedex/api/pokemon/<slug>")
 def pokemon(slug: str) -> Any:
-    data = POKEDEX.get(slug.lower())
-    if not data:
+    """One entry by slug or national dex number, sent as pre-serialised bytes."""
+    data = DEX_ROWS.get().json(slug)
+    if data is None:
         return jsonify({"error": "not found"}), 404
-    return jsonify(data)
+    return Response(data, mimetype="application/json")
 
 
 # ---------- competitive usage ----------
-@app.route("/api/usage/<slug>")
-@app.route("/pointkedex/api/usage/<slug>")
+@api.route("/api/usage/<slug>")
+@api.route("/pointkedex/api/usage/<slug>")
 def usage(slug: str) -> Any:
-    key = normalize_key(slug)
-    data = USAGE.get(key)
+    """``?tier=<name>`` and ``?fields=summary|sets`` project the blob (see usage_store)."""
+    try:
+        data = USAGE.get().json(slug, request.args.get("tier"), request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if data is None:
+        print(f"[!] usage miss for slug='{slug}' normalized='{normalize_key(slug)}'", file=sys.stderr)
+    return Response(data or b"{}", mimetype="application/json")
+
+
+@api.route("/api/usage/<slug>/tiers")
+@api.route("/pointkedex/api/usage/<slug>/tiers")
+def usage_tiers(slug: str) -> Any:
+    """Tier names and set counts, for building tabs before fetching any sets."""
+    return Response(USAGE.get().tiers(slug) or b'{"tiers":[],"sets":{}}', mimetype="application/json")
+
+
+# ---------- flavor text ----------
+@api.route("/api/flavor/<slug>")
+@api.route("/pointkedex/api/flavor/<slug>")
+def flavor(slug: str) -> Any:
+    """The species' distinct flavor-text lines; ``?first=1`` for just the first."""
+    data = FLAVOR.get().json(slug, first=request.args.get("first") in ("1", "true"))
     if data is None:
-        print(f"[!] usage miss for slug='{slug}' normalized='{key}'", file=sys.stderr)
-    return jsonify(data or {})
+        return jsonify({"error": "not found"}), 404
+    return cacheable_json(data)
+
+
+# ---------- data reload ----------
+def admin_allowed(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token or "", ADMIN_TOKEN)
+
+
+def reload_async() -> None:
+    threading.Thread(target=reload_data, kwargs={"force": True}, name="data-reload", daemon=True).start()
+
+
+@api.route("/api/admin/reload", methods=["POST"])
+@api.route("/pointkedex/api/admin/reload", methods=["POST"])
+def admin_reload() -> Any:
+    """Re-read the data files now (this worker; the rest follow via their watchers)."""
+    if not admin_allowed(request.headers.get("X-Admin-Token")):
+        return jsonify({"error": "forbidden"}), 403
+    reload_async()
+    return jsonify({"reloading": list(DATA_SOURCES), "versions": data_versions()}), 202
+
+
+# ---------- batch lookup ----------
+def lookup_fragment(slug: str, parts: List[str], stores: Dict[str, Callable]) -> bytes:
+    """``"slug":{"dex":…,"usage":…,"flavor":…}`` from the stored bytes; ``null`` for misses."""
+    fields = (b'"' + p.encode() + b'":' + (stores[p](slug) or b"null") for p in parts)
+    return json.dumps(slug).encode() + b":{" + b",".join(fields) + b"}"
+
+
+def _str_list(name: str, v: Any) -> List[str]:
+    """A comma string or a list of strings, stripped; ``ValueError`` for anything else."""
+    if v is None:
+        return []
+    if isinstance(v, str):
+        v = v.split(",")
+    elif not isinstance(v, list) or not all(isinstance(x, str) for x in v):
+        raise ValueError(f"{name} must be a list of strings or a comma-separated string")
+    return [x.strip() for x in v if x.strip()]
+
+
+def lookup_request(slugs: Any, include: Any) -> tuple[List[str], List[str]]:
+    """Validate ``slugs`` / ``include`` (lists or comma strings); ``ValueError`` if bad."""
+    slugs = list(dict.fromkeys(s.lower() for s in _str_list("slugs", slugs)))
+    parts = _str_list("include", include) or list(LOOKUP_PARTS)
+    if not slugs:
+        raise ValueError("no slugs given")
+    if len(slugs) > LOOKUP_MAX:
+        raise ValueError(f"at most {LOOKUP_MAX} slugs per call")
+    bad = [p for p in parts if p not in LOOKUP_PARTS]
+    if bad:
+        raise ValueError(f"unknown include {bad} (choose from {', '.join(LOOKUP_PARTS)})")
+    return slugs, parts
+
+
+def lookup_body(slugs: List[str], parts: List[str]) -> bytes:
+    flavor = FLAVOR.get()
+    stores = {"dex": DEX_ROWS.get().json, "usage": USAGE.get().json, "flavor": flavor.get}
+    return b"{" + b",".join(lookup_fragment(s, parts, stores) for s in slugs) + b"}"
+
+
+@api.route("/api/batch", methods=["GET", "POST"])
+@api.route("/pointkedex/api/batch", methods=["GET", "POST"])
+def batch() -> Any:
+    """Dex / usage / flavor for many slugs in one call.
+
+    ``GET ?slugs=a,b&include=dex,usage`` or ``POST {"slugs": [...], "include": [...]}``;
+    answers ``{"<slug>": {"dex": …, "usage": …, "flavor": …}}`` with ``null`` for misses.
+    """
+    src = request.get_json(silent=True) if request.method == "POST" else request.args
+    if not hasattr(src, "get"):  # POST body missing, not JSON, or not an object
+        return jsonify({"error": "body must be a JSON object"}), 400
+    try:
+        slugs, parts = lookup_request(src.get("slugs"), src.get("include"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    body = lookup_body(slugs, parts)
+    if request.method == "GET":
+        return cacheable_json(body)
+    return Response(body, mimetype="application/json")
+
+
+# ---------- app factory ----------
+def create_app(load: str | None = None) -> Flask:
+    """Build the Flask app; ``load`` (default ``MODEL_LOAD``) picks when the model loads.
+
+    ``preload`` loads labels, data and static files before returning and
+    then freezes the GC so the forked gunicorn workers don't dirty (and
+    copy) those pages just by collecting them.  The model is left to each
+    worker after the fork, since inference runtimes can't be forked.
+    """
+    global _mode, _ready_s
+    load = load or MODEL_LOAD
+    if load not in LOAD_MODES:
+        raise ValueError(f"unknown MODEL_LOAD {load!r} (choose {', '.join(LOAD_MODES)})")
+    _mode = load
+    app = Flask(__name__, static_folder=str(ROOT))
+    app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD
+    CORS(app, expose_headers=["X-Data-Version"])
+    app.register_blueprint(api)
+
+    if load == "preload":
+        IDX2NAME.get()
+        POKEDEX.get()
+        DEX_ROWS.get()
+        USAGE.get()
+        FLAVOR.get()
+        STATIC.warm(PRECOMPRESS)
+        gc.freeze()
+        os.register_at_fork(after_in_child=warm_up_async)  # model: per worker, after the fork
+    elif load == "background":
+        warm_up_async()
+    elif _ready_s is None:
+        _ready_s = time.perf_counter() - _T_IMPORT
+        print(f"[✓] ready {_ready_s:.2f}s after import (pid {os.getpid()}, lazy: model loads on first use)",
+              file=sys.stderr)
+    print(f"[✓] app created in {time.perf_counter() - _T_IMPORT:.2f}s ({load} model load)", file=sys.stderr)
+    return app
+
 
+app = create_app()
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=int(os.getenv("PORT", 5000)), debug=False)
+    app.run(host="0.0.0.0", port=ARGS.port, debug=False)
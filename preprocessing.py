@@ -0,0 +1,96 @@
+"""preprocessing.py
+----------------------------------
+Image decoding and ResNet-50 input preprocessing, NumPy only.
+
+Shared by ``predict_server.py``, ``predict_live.py`` and the export /
+quantization tools so every path feeds the model identical tensors.
+
+Decoding
+--------
+JPEG frames from phones are usually 720p or larger but the model only sees
+224×224.  libjpeg can do most of that downscale during the inverse DCT
+(scale factors 1/2, 1/4, 1/8), which skips most of the decode work.
+:func:`decode_image` asks PIL for that via ``Image.draft`` before the final
+resize::
+
+    rgb = decode_image(fp, (224, 224))              # DCT-scaled decode
+    rgb = decode_image(fp, (224, 224), fast=False)  # full decode, old path
+
+``draft`` never goes below the requested size, so the final resize still
+does the last (< 2×) step with PIL's normal filter.  Non-JPEG inputs
+(PNG, WebP) are decoded in full.
+
+Normalisation
+-------------
+:func:`caffe_preprocess` is Keras' ``resnet50.preprocess_input`` ("caffe"
+mode: RGB→BGR, subtract the ImageNet BGR mean) written as one ufunc call
+into a caller-supplied float32 buffer.  :class:`BatchBuffer` keeps one such
+``(max_batch, 224, 224, 3)`` buffer alive so a whole batch is normalised
+without any per-image float allocation::
+
+    buf = BatchBuffer(32)
+    x = buf.fill([rgb_uint8_a, rgb_uint8_b])   # view of the first 2 rows
+
+The result is bit-identical to Keras; ``tests/test_preprocessing.py``
+checks that against TensorFlow when it is installed.
+"""
+from __future__ import annotations
+
+from typing import IO, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+__all__ = ["decode_image", "caffe_preprocess", "BatchBuffer", "CAFFE_MEAN_BGR"]
+
+CAFFE_MEAN_BGR = np.array([103.939, 116.779, 123.68], np.float32)
+
+
+def decode_image(fp: IO[bytes], size: Tuple[int, int], fast: bool = True) -> Image.Image:
+    """Decode ``fp`` to an RGB image resized to ``size`` (width, height)."""
+    img = Image.open(fp)
+    if fast and img.format == "JPEG":
+        img.draft("RGB", size)
+    return img.convert("RGB").resize(size)
+
+
+def caffe_preprocess(img: np.ndarray, out: np.ndarray | None = None, order: str = "RGB") -> np.ndarray:
+    """Keras "caffe" preprocessing of ``img`` (``(..., H, W, 3|4)``) into ``out``.
+
+    ``order`` is the channel order of ``img``: ``"RGB"`` (PIL) is flipped to
+    BGR, ``"BGR"``/``"BGRA"`` (OpenCV, mss) is used as-is, alpha dropped.
+    """
+    src = img[..., 2::-1] if order == "RGB" else img[..., :3]
+    if out is None:
+        out = np.empty(src.shape, np.float32)
+    # uint8 -> float32 is exact, and the subtraction runs in float32 like Keras
+    np.subtract(src, CAFFE_MEAN_BGR, out=out, dtype=np.float32)
+    return out
+
+
+class BatchBuffer:
+    """Preallocated float32 model-input batch, refilled in place.
+
+    Parameters
+    ----------
+    max_batch: int
+        Number of rows to allocate.
+    shape: Tuple[int, int, int]
+        Per-image ``(H, W, C)`` shape.
+    order: str
+        Channel order of the images passed to :meth:`fill`.
+    """
+
+    def __init__(self, max_batch: int, shape: Tuple[int, int, int] = (224, 224, 3), order: str = "RGB") -> None:
+        self.buf = np.empty((max_batch, *shape), np.float32)
+        self.order = order
+
+    def fill(self, images: Sequence[np.ndarray]) -> np.ndarray:
+        """Normalise ``images`` into the buffer and return the filled rows."""
+        n = len(images)
+        if n > len(self.buf):
+            raise ValueError(f"batch of {n} exceeds buffer of {len(self.buf)}")
+        for row, img in zip(self.buf, images):
+            caffe_preprocess(img, out=row, order=self.order)
+        return self.buf[:n]
+
@@ -0,0 +1,235 @@
+"""quantize_model.py
+----------------------------------
+Offline post-training quantization of the Pokédex classifier, with an
+accuracy gate.
+
+Usage::
+
+    python quantize_model.py --calib photos/ --eval photos-by-class/
+    python quantize_model.py --variants int8 --calib photos/ --eval photos-by-class/ --max-drop 0.005
+    python quantize_model.py --variants web-uint8 --eval photos-by-class/ --web-out web_model
+
+Variants
+--------
+``dynamic``      int8 weights, float activations  -> ``pokedex_resnet50.dynamic.tflite``
+``int8``         full-integer int8 (weights + activations, float I/O),
+                 calibrated on ``--calib``        -> ``pokedex_resnet50.int8.tflite``
+``web-float16``  TF-JS shards with float16 weights -> ``web_model_float16/``
+``web-uint8``    TF-JS shards with uint8 affine weights -> ``web_model_uint8/``
+
+``--eval`` is always required, and ``--calib`` whenever ``int8`` is built:
+a model calibrated or scored on anything but real photos proves nothing.  Every variant is scored against
+the float Keras model over ``--eval``, which must be laid out as
+``<eval>/<ClassName>/*.jpg`` (names as in ``class_indices.json``) so the
+score is true top-1/top-5 accuracy.  The TF-JS variants are scored by
+applying the exact TF-JS dequantization to the Keras weights.
+
+Each artefact gets ``<artefact>.report.json`` next to it (``web_model_uint8``
+-> ``web_model_uint8.report.json``), recording its hash and where the
+calibration and evaluation images came from and how many were used.  A
+variant losing more than ``--max-drop`` top-1 makes the script exit 1, and
+:func:`inference.check_accuracy_gate` refuses it later as well, as it does
+any report scored on fewer than ``QUANT_MIN_SAMPLES`` labelled images: the
+server checks ``.tflite`` files at start, and the Pages deploy runs
+:func:`inference.check_web_model` on ``web_model/`` before publishing it.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import numpy as np
+import tensorflow as tf
+
+from export_model import list_images, load_samples, predict_all, preprocess_files
+from inference import (QUANT_MAX_DROP, QUANT_MIN_SAMPLES, KerasBackend, TFLiteBackend, artefact_digest,
+                       quant_report_path)
+
+ROOT = Path(__file__).resolve().parent
+MODEL_PATH = ROOT / "pokedex_resnet50.h5"
+LABEL_PATH = ROOT / "class_indices.json"
+VARIANTS = ("dynamic", "int8", "web-float16", "web-uint8")
+
+
+# ------------------------------------------------------------------
+# Data
+# ------------------------------------------------------------------
+def calibration_set(folder: Path, limit: int, input_shape: Sequence[int]) -> np.ndarray:
+    """Shuffled sample of ``folder`` so every class is represented."""
+    return load_samples(folder, limit, input_shape, seed=0)
+
+
+def eval_set(folder: Path, limit: int, input_shape: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Return ``(x, labels)`` from a class-labelled folder; ``ValueError`` if it isn't one."""
+    files = list_images(folder, limit, seed=1)
+    raw = json.loads(LABEL_PATH.read_text("utf-8"))
+    name2idx = {k.lower(): v for k, v in raw.items()} if all(isinstance(v, int) for v in raw.values()) \
+        else {v.lower(): int(k) for k, v in raw.items()}
+    labels = [name2idx.get(f.parent.name.lower()) for f in files]
+    unknown = sorted({f.parent.name for f, l in zip(files, labels) if l is None})
+    if unknown:
+        raise ValueError(f"{folder}: sub-folders {unknown[:5]} are not class names "
+                         "(expected <eval>/<ClassName>/*.jpg)")
+    return preprocess_files(files, input_shape), np.asarray(labels)
+
+
+# ------------------------------------------------------------------
+# Converters
+# ------------------------------------------------------------------
+def convert_dynamic(model) -> bytes:
+    conv = tf.lite.TFLiteConverter.from_keras_model(model)
+    conv.optimizations = [tf.lite.Optimize.DEFAULT]
+    return conv.convert()
+
+
+def convert_int8(model, calib: np.ndarray) -> bytes:
+    conv = tf.lite.TFLiteConverter.from_keras_model(model)
+    conv.optimizations = [tf.lite.Optimize.DEFAULT]
+    conv.representative_dataset = lambda: ([x[None]] for x in calib)
+    conv.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    # float32 in/out keeps the backend interface unchanged
+    return conv.convert()
+
+
+def tfjs_dequantize(w: np.ndarray, dtype: str) -> np.ndarray:
+    """Round-trip ``w`` through TF-JS weight quantization."""
+    if w.dtype != np.float32:
+        return w
+    if dtype == "float16":
+        return w.astype(np.float16).astype(np.float32)
+    # uint8: per-tensor affine with a nudged zero point, as tensorflowjs does
+    lo, hi = min(0.0, float(w.min())), max(0.0, float(w.max()))
+    scale = (hi - lo) / 255 or 1.0
+    lo = -round(-lo / scale) * scale
+    q = np.round((np.clip(w, lo, lo + 255 * scale) - lo) / scale)
+    return (q * scale + lo).astype(np.float32)
+
+
+def export_web(model_path: Path, out: Path, dtype: str) -> None:
+    subprocess.run(
+        ["tensorflowjs_converter", "--input_format=keras", f"--quantize_{dtype}", str(model_path), str(out)],
+        check=True,
+    )
+
+
+# ------------------------------------------------------------------
+# Scoring
+# ------------------------------------------------------------------
+def topk(probs: np.ndarray, y: np.ndarray) -> Dict[str, float]:
+    top5 = np.argsort(-probs, axis=1)[:, :5]
+    return {
+        "top1": float((top5[:, 0] == y).mean()),
+        "top5": float((top5 == y[:, None]).any(1).mean()),
+    }
+
+
+def make_report(variant: str, artefact: Path, digest_of: Path, size: int, float_size: int,
+                ref: np.ndarray, out: np.ndarray, y: np.ndarray, max_drop: float,
+                sources: Dict[str, Optional[str]]) -> Dict:
+    base, quant = topk(ref, y), topk(out, y)
+    drop = base["top1"] - quant["top1"]
+    return {
+        "variant": variant,
+        "artefact": artefact.name,
+        "sha256": artefact_digest(digest_of),
+        "bytes": size,
+        "float_bytes": float_size,
+        "compression": round(float_size / size, 2) if size else None,
+        "samples": int(len(ref)),
+        "reference": "labels",
+        "labelled": True,
+        "eval_source": sources["eval"],
+        "calib_source": sources["calib"] if variant == "int8" else None,
+        "float": base,
+        "quant": quant,
+        "top1_drop": round(drop, 6),
+        "top5_drop": round(base["top5"] - quant["top5"], 6),
+        "max_drop": max_drop,
+        "passed": drop <= max_drop,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def _dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+# ------------------------------------------------------------------
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Post-training quantization with an accuracy gate.")
+    ap.add_argument("--model", type=Path, default=MODEL_PATH)
+    ap.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS))
+    ap.add_argument("--calib", type=Path, help="folder of calibration images (required for int8)")
+    ap.add_argument("--calib-size", type=int, default=200)
+    ap.add_argument("--eval", type=Path, required=True,
+                    help="folder of evaluation images, <eval>/<ClassName>/*.jpg")
+    ap.add_argument("--eval-size", type=int, default=500)
+    ap.add_argument("--max-drop", type=float, default=QUANT_MAX_DROP, help="allowed top-1 loss (0.01 = 1 pt)")
+    ap.add_argument("--web-out", type=Path, help="TF-JS output folder (default web_model_<dtype>)")
+    args = ap.parse_args()
+    if "int8" in args.variants and args.calib is None:
+        ap.error("the int8 variant needs real calibration images: pass --calib <dir>")
+
+    model = tf.keras.models.load_model(args.model, compile=False)
+    shape = model.input_shape[1:]
+    try:
+        x, y = eval_set(args.eval, args.eval_size, shape)
+    except ValueError as e:
+        ap.error(str(e))
+    if len(x) < QUANT_MIN_SAMPLES:
+        ap.error(f"--eval has {len(x)} images, the accuracy gate needs at least {QUANT_MIN_SAMPLES}")
+    sources = {"eval": str(args.eval.resolve()), "calib": str(args.calib.resolve()) if args.calib else None}
+    ref = predict_all(KerasBackend(model), x)
+    float_tflite = args.model.with_suffix(".tflite")
+    float_size = float_tflite.stat().st_size if float_tflite.exists() else args.model.stat().st_size
+
+    reports: List[Dict] = []
+    for variant in args.variants:
+        if variant in ("dynamic", "int8"):
+            out = args.model.with_suffix(f".{variant}.tflite")
+            if variant == "int8":
+                blob = convert_int8(model, calibration_set(args.calib, args.calib_size, shape))
+            else:
+                blob = convert_dynamic(model)
+            out.write_bytes(blob)
+            q = predict_all(TFLiteBackend(out), x)
+            report = make_report(variant, out, out, len(blob), float_size, ref, q, y, args.max_drop, sources)
+            report_path = quant_report_path(out)
+        else:
+            dtype = variant.split("-", 1)[1]
+            out = args.web_out or ROOT / f"web_model_{dtype}"
+            export_web(args.model, out, dtype)
+            weights = model.get_weights()
+            model.set_weights([tfjs_dequantize(w, dtype) for w in weights])
+            q = predict_all(KerasBackend(model), x)
+            model.set_weights(weights)
+            web_float = ROOT / "web_model"
+            report = make_report(variant, out, out, _dir_size(out),
+                                 _dir_size(web_float) if web_float.exists() else float_size,
+                                 ref, q, y, args.max_drop, sources)
+            report_path = quant_report_path(out)
+
+        report_path.write_text(json.dumps(report, indent=2), "utf-8")
+        reports.append(report)
+        mark = "✓" if report["passed"] else "✗"
+        base, quant = report["float"], report["quant"]
+        print(f"[{mark}] {variant:<12} top-1 {quant['top1']:.2%} (Δ {quant['top1'] - base['top1']:+.2%})  "
+              f"top-5 {quant['top5']:.2%} (Δ {quant['top5'] - base['top5']:+.2%})  "
+              f"{report['bytes'] / 2**20:.1f} MB, {report['compression']}× smaller", file=sys.stderr)
+
+    if not all(r["passed"] for r in reports):
+        print(f"[✗] at least one variant exceeds the {args.max_drop:.2%} top-1 budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,13 @@
    Pointkedex Service Worker
    ───────────────────────── */
 
-const CACHE_VERSION = 'v4';
+const CACHE_VERSION = 'v5';
 const CACHE_NAME    = `pointkedex-${CACHE_VERSION}`;
 
 /* Core offline assets (kept minimal + dynamic) */
 const CORE_ASSETS = [
   '/', '/index.html', '/styles.css', '/app.js',
-  '/manifest.webmanifest', '/flavor_text.json', '/class_indices.json',
+  '/manifest.webmanifest', '/class_indices.json',
   '/usage_data.json'
 ];
 
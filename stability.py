@@ -0,0 +1,453 @@
+"""stability.py
+----------------------------------
+Per-client "is the prediction stable yet?" history.
+
+Each tracker keeps one fixed-size row of state per client, so memory is
+bounded by ``max_clients`` no matter how many distinct clients show up.
+Idle clients expire after ``ttl`` seconds; when the table is full the
+least recently seen client is evicted.
+
+Rules
+-----
+:class:`StabilityTracker` (``streak``)
+    Stable once the last ``window`` frames all agree on the class and all
+    clear ``thresh`` confidence.  Ring arrays of ``int16`` class and
+    ``float32`` confidence.
+:class:`EmaStabilityTracker` (``ema``)
+    Stable once an exponential moving average of the probability vector
+    agrees with the current frame at ``thresh`` or more.  One ``float16``
+    row per client.
+
+Stores
+------
+Trackers are in-process (one per gunicorn worker) by default.
+:class:`SharedStabilityTracker` hosts one tracker per box behind a Unix
+socket so every worker sees the same history.  The first worker to grab
+``<socket>.lock`` hosts it; if that worker dies another one takes over on
+the next miss (the kernel drops its ``flock``).  Any socket error falls
+back to a local tracker for that call, so a request never fails on this;
+every socket call times out after ``STABILITY_TIMEOUT_MS`` (default 50 ms),
+and after a timeout the worker stays local for ``STABILITY_RETRY_S``
+seconds, so a wedged host costs one timeout per worker thread, not one
+per request.
+The socket and lock live in a ``0700`` directory of the server's user,
+the host only accepts peers with the same uid, and messages are a fixed
+binary layout (nothing is unpickled).
+
+All expose ``update(client_id, probs) -> bool`` and ``stats()``.
+"""
+from __future__ import annotations
+
+import fcntl
+import functools
+import json
+import os
+import socket
+import stat
+import struct
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+__all__ = ["StabilityTracker", "EmaStabilityTracker", "SharedStabilityTracker", "make_tracker"]
+
+DEFAULT_MAX_CLIENTS = 4096
+DEFAULT_TTL = 300.0  # seconds without a frame before a client is forgotten
+SOCKET_TIMEOUT = float(os.getenv("STABILITY_TIMEOUT_MS", "50")) / 1000
+RETRY_AFTER = float(os.getenv("STABILITY_RETRY_S", "5"))  # stay local this long after a timeout
+
+
+class _ClientTable:
+    """Slot allocator shared by the trackers: one row per client, LRU + TTL.
+
+    Parameters
+    ----------
+    max_clients: int
+        Table size; the least recently seen client is evicted beyond it.
+    ttl: float
+        Seconds of silence after which a client's history is dropped.
+    """
+
+    def __init__(self, max_clients: int = DEFAULT_MAX_CLIENTS, ttl: float = DEFAULT_TTL) -> None:
+        self.max_clients = max_clients
+        self.ttl = ttl
+        self._seen = np.zeros(max_clients, np.float64)
+        self._slots: "OrderedDict[str, int]" = OrderedDict()  # LRU order, oldest first
+        self._free: List[int] = list(range(max_clients - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.expired = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "clients": len(self._slots),
+                "max_clients": self.max_clients,
+                "evicted": self.evicted,
+                "expired": self.expired,
+            }
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _slot(self, client_id: str, now: float) -> Tuple[int, bool]:
+        """Return ``(slot, is_new)`` for ``client_id``; caller holds the lock."""
+        cutoff = now - self.ttl
+        while self._slots:
+            key, slot = next(iter(self._slots.items()))
+            if self._seen[slot] >= cutoff:
+                break
+            del self._slots[key]
+            self._free.append(slot)
+            self.expired += 1
+
+        slot = self._slots.get(client_id)
+        if slot is not None:
+            self._slots.move_to_end(client_id)
+            self._seen[slot] = now
+            return slot, False
+        if not self._free:
+            _, old = self._slots.popitem(last=False)
+            self._free.append(old)
+            self.evicted += 1
+        slot = self._free.pop()
+        self._slots[client_id] = slot
+        self._seen[slot] = now
+        return slot, True
+
+
+class StabilityTracker(_ClientTable):
+    """Streak rule: the last ``window`` frames agree and all clear ``thresh``.
+
+    History is a ring of ``window`` (``int16`` class, ``float32`` conf) per
+    client.
+
+    Parameters
+    ----------
+    window: int
+        Frames that must agree (``STABLE_CNT``).
+    thresh: float
+        Minimum confidence of each of those frames (``THRESH_CONF``).
+    max_clients, ttl:
+        See :class:`_ClientTable`.
+    """
+
+    mode = "streak"
+
+    def __init__(self, window: int, thresh: float, max_clients: int = DEFAULT_MAX_CLIENTS,
+                 ttl: float = DEFAULT_TTL) -> None:
+        super().__init__(max_clients, ttl)
+        self.window = window
+        self.thresh = thresh
+        self._idx = np.full((max_clients, window), -1, np.int16)
+        self._conf = np.zeros((max_clients, window), np.float32)
+        self._head = np.zeros(max_clients, np.uint8)   # next ring position
+        self._count = np.zeros(max_clients, np.uint8)  # filled positions
+
+    def update(self, client_id: str, probs: np.ndarray) -> bool:
+        """Record one prediction and return whether the client is stable."""
+        idx, conf = int(probs.argmax()), float(probs.max())
+        with self._lock:
+            slot, new = self._slot(client_id, time.monotonic())
+            if new:
+                self._head[slot] = self._count[slot] = 0
+            h = self._head[slot]
+            self._idx[slot, h] = idx
+            self._conf[slot, h] = conf
+            self._head[slot] = (h + 1) % self.window
+            self._count[slot] = min(self._count[slot] + 1, self.window)
+            return bool(
+                self._count[slot] == self.window
+                and (self._idx[slot] == idx).all()
+                and (self._conf[slot] >= self.thresh).all()
+            )
+
+
+class EmaStabilityTracker(_ClientTable):
+    """EMA rule: an exponential moving average of each client's probability
+    vector, stable once its argmax matches the current frame with at least
+    ``thresh`` smoothed probability after ``min_frames`` frames.
+
+    One noisy frame dents the average instead of resetting a streak, and a
+    confident answer settles in fewer frames.  State is one ``float16``
+    row of ``classes`` per client (~2 KB for 1025 classes).
+
+    Parameters
+    ----------
+    alpha: float
+        Weight of the newest frame, in (0, 1].
+    thresh: float
+        Smoothed probability the top class must reach.
+    min_frames: int
+        Frames seen before a client can be stable.
+    max_clients, ttl:
+        See :class:`_ClientTable`.
+    """
+
+    mode = "ema"
+
+    def __init__(self, alpha: float, thresh: float, min_frames: int = 2,
+                 max_clients: int = DEFAULT_MAX_CLIENTS, ttl: float = DEFAULT_TTL) -> None:
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be in (0, 1].")
+        super().__init__(max_clients, ttl)
+        self.alpha = alpha
+        self.thresh = thresh
+        self.min_frames = min_frames
+        self._ema: Optional[np.ndarray] = None  # (max_clients, classes), sized on first update
+        self._count = np.zeros(max_clients, np.uint16)
+
+    def update(self, client_id: str, probs: np.ndarray) -> bool:
+        p = np.asarray(probs, np.float32)
+        with self._lock:
+            if self._ema is None:
+                self._ema = np.zeros((self.max_clients, len(p)), np.float16)
+            slot, new = self._slot(client_id, time.monotonic())
+            if new:
+                ema = p
+                self._count[slot] = 1
+            else:
+                ema = self._ema[slot].astype(np.float32)
+                ema *= 1 - self.alpha
+                ema += self.alpha * p
+                self._count[slot] = min(int(self._count[slot]) + 1, 0xFFFF)
+            self._ema[slot] = ema
+            top = int(ema.argmax())
+            return bool(
+                self._count[slot] >= self.min_frames
+                and top == int(p.argmax())
+                and ema[top] >= self.thresh
+            )
+
+
+def default_socket() -> str:
+    """``$XDG_RUNTIME_DIR/pointkedex-<uid>/stability.sock`` (``/tmp`` without a runtime dir)."""
+    base = os.getenv("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(base, f"pointkedex-{os.getuid()}", "stability.sock")
+
+
+def private_dir(address: str) -> str:
+    """Create the socket's directory ``0700``; refuse one another user could get into."""
+    d = os.path.dirname(os.path.abspath(address))
+    os.makedirs(d, 0o700, exist_ok=True)
+    st = os.lstat(d)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(f"{d} must be a directory owned by uid {os.getuid()} with mode 0700")
+    return d
+
+
+# Wire format, both ways fixed-layout (no pickle):
+#   request   <op:u8><id_len:u16><payload_len:u32> id (utf-8) payload
+#             update: payload = float16 probabilities; stats: empty
+#   response  update: <stable:u8>; stats: <len:u32> JSON
+_REQ = struct.Struct("<BHI")
+_LEN = struct.Struct("<I")
+OP_UPDATE, OP_STATS = 1, 2
+MAX_PAYLOAD = 1 << 20
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("peer closed")
+        buf += chunk
+    return bytes(buf)
+
+
+def _peer_uid(sock: socket.socket) -> Optional[int]:
+    if not hasattr(socket, "SO_PEERCRED"):  # pragma: no cover – non-Linux
+        return None
+    _, uid, _ = struct.unpack("3i", sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")))
+    return uid
+
+
+class SharedStabilityTracker:
+    """One tracker per box, shared over a Unix socket.
+
+    Parameters
+    ----------
+    factory: Callable[[], tracker]
+        Builds the hosted tracker (and the per-call fallback), e.g.
+        ``functools.partial(EmaStabilityTracker, 0.5, 0.35)``.
+    address: str
+        Unix socket path (default :func:`default_socket`); ``<address>.lock``
+        elects the hosting process.  Its directory must be private to this
+        user (``0700``), otherwise every call stays in-process.
+    """
+
+    def __init__(self, factory: Callable[[], _ClientTable], address: Optional[str] = None) -> None:
+        self._factory = factory
+        self.address = address or default_socket()
+        self._table: Optional[_ClientTable] = None  # set while hosting
+        self._fallback = factory()
+        self._local = threading.local()
+        self._host_lock = threading.Lock()
+        self._lock_fd: Optional[int] = None
+        self._pid = os.getpid()
+        self._skip_until = 0.0  # monotonic time before which calls stay local
+        try:
+            private_dir(self.address)
+            self._enabled = True
+        except OSError as e:
+            print(f"[!] shared stability store disabled, using a per-worker one: {e}", file=sys.stderr)
+            self._enabled = False
+
+    # ------------------------------------------------------------------
+    def update(self, client_id: str, probs: np.ndarray) -> bool:
+        # float16 halves what crosses the socket; the trackers keep no more precision
+        return self._call("update", client_id, np.asarray(probs, np.float16))
+
+    def stats(self) -> Dict[str, Any]:
+        st = self._call("stats")
+        st["shared"] = self._enabled
+        return st
+
+    # ------------------------------------------------------------------
+    def _call(self, op: str, *args: Any) -> Any:
+        self._check_fork()
+        remote = self._enabled and time.monotonic() >= self._skip_until
+        for _ in range(2 if remote else 0):
+            if self._table is not None:
+                return getattr(self._table, op)(*args)
+            try:
+                return self._remote(self._conn(), op, *args)
+            except socket.timeout:  # host alive but wedged: don't queue behind it
+                self._drop_conn()
+                self._skip_until = time.monotonic() + RETRY_AFTER
+                print(f"[!] shared stability store timed out, staying local for {RETRY_AFTER:g}s",
+                      file=sys.stderr)
+                break
+            except OSError:
+                self._drop_conn()
+                self._try_host()
+        return getattr(self._fallback, op)(*args)
+
+    def _drop_conn(self) -> None:
+        conn, self._local.conn = getattr(self._local, "conn", None), None
+        if conn is not None:
+            conn.close()
+
+    @staticmethod
+    def _remote(sock: socket.socket, op: str, *args: Any) -> Any:
+        if op == "update":
+            client_id, probs = args
+            cid = client_id.encode()[:0xFFFF]
+            payload = probs.tobytes()
+            sock.sendall(_REQ.pack(OP_UPDATE, len(cid), len(payload)) + cid + payload)
+            return _recv_exact(sock, 1) == b"\x01"
+        sock.sendall(_REQ.pack(OP_STATS, 0, 0))
+        (n,) = _LEN.unpack(_recv_exact(sock, _LEN.size))
+        return json.loads(_recv_exact(sock, n))
+
+    def _conn(self) -> socket.socket:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.settimeout(SOCKET_TIMEOUT)
+            try:
+                conn.connect(self.address)
+            except socket.timeout:
+                conn.close()
+                raise
+            except OSError:
+                conn.close()
+                self._try_host()
+                if self._table is not None:
+                    raise  # we are the host now; caller retries locally
+                conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                conn.settimeout(SOCKET_TIMEOUT)
+                conn.connect(self.address)
+            self._local.conn = conn
+        return conn
+
+    def _check_fork(self) -> None:
+        # connections and host role never survive a fork (e.g. --preload)
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._local = threading.local()
+            self._table = None
+            self._lock_fd = None
+
+    def _try_host(self) -> None:
+        with self._host_lock:
+            if self._table is not None:
+                return
+            private_dir(self.address)
+            fd = os.open(self.address + ".lock", os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return  # someone else hosts
+            if os.path.exists(self.address):
+                os.unlink(self.address)  # stale socket from a dead host
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(self.address)
+            os.chmod(self.address, 0o600)
+            listener.listen(64)
+            self._lock_fd = fd
+            self._table = self._factory()
+            threading.Thread(target=self._serve, args=(listener, self._table),
+                             name="stability-host", daemon=True).start()
+            print(f"[✓] hosting shared stability store on {self.address} (pid {os.getpid()})", file=sys.stderr)
+
+    @staticmethod
+    def _serve(listener: socket.socket, table: _ClientTable) -> None:
+        uid = os.getuid()
+
+        def handle(conn: socket.socket) -> None:
+            with conn:
+                while True:
+                    try:
+                        op, id_len, n = _REQ.unpack(_recv_exact(conn, _REQ.size))
+                        if n > MAX_PAYLOAD or op not in (OP_UPDATE, OP_STATS):
+                            return  # not a worker talking; drop it
+                        client_id = _recv_exact(conn, id_len).decode()
+                        payload = _recv_exact(conn, n)
+                        if op == OP_UPDATE:
+                            if not payload or n % 2:
+                                return
+                            stable = table.update(client_id, np.frombuffer(payload, np.float16))
+                            conn.sendall(b"\x01" if stable else b"\x00")
+                        else:
+                            body = json.dumps(table.stats()).encode()
+                            conn.sendall(_LEN.pack(len(body)) + body)
+                    except (OSError, UnicodeDecodeError):
+                        return
+
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                continue
+            if _peer_uid(conn) not in (None, uid):  # only this user's processes
+                conn.close()
+                continue
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+
+MODES = {"streak": StabilityTracker, "ema": EmaStabilityTracker}
+
+
+def make_tracker(store: str, mode: str, *args: Any, address: Optional[str] = None, **kw: Any):
+    """Build a ``mode`` tracker (``streak`` | ``ema``) in a ``store`` (``local`` | ``shared``).
+
+    ``args``/``kw`` go to the tracker class, e.g.
+    ``make_tracker("local", "ema", 0.5, 0.35, min_frames=2)``.
+    """
+    if mode not in MODES:
+        raise ValueError(f"unknown stability mode {mode!r} (choose {' or '.join(MODES)})")
+    factory = functools.partial(MODES[mode], *args, **kw)
+    if store == "local":
+        return factory()
+    if store == "shared":
+        return SharedStabilityTracker(factory, address=address)
+    raise ValueError(f"unknown stability store {store!r} (choose local or shared)")
@@ -0,0 +1,294 @@
+"""static_assets.py
+----------------------------------
+In-memory static files with precomputed gzip / brotli variants and strong
+ETags, shared by the Flask and ASGI servers.
+
+Usage::
+
+    assets = StaticAssets(ROOT)
+    assets.warm(PRECOMPRESS)                  # compress the big JSON up front
+    hit = assets.respond("pokedex_data.json", accept_encoding, if_none_match)
+    if hit is None:                           # missing
+        ...
+    status, headers, body = hit               # body: bytes, or a Path to send from disk
+
+Small text assets (HTML, JS, CSS, JSON, …) are read, hashed and
+compressed once, on :meth:`StaticAssets.warm` or their first request, then
+served from memory: once a URL has been seen, neither a 200 nor a 304
+for it touches the disk.  Each encoding is its own representation with its own
+ETag (``"<sha256>"``, ``"<sha256>-gz"``, ``"<sha256>-br"``), chosen from
+``Accept-Encoding`` (brotli needs the optional ``brotli`` package).  The
+in-memory cache holds files up to ``max_bytes`` each and ``max_total``
+(``STATIC_CACHE_MB``) altogether.
+
+Everything else – weight shards, the ``.h5``, images, anything past the
+cap – stays on disk: only its sha256 is kept (recomputed when the file's
+mtime or size changes), and ``respond`` hands back the path for the caller
+to stream with those headers.  Such a file costs one ``stat()`` per request
+to notice changes, except when it is asked for with its current ``?v=``:
+that URL names the content, so the cached ETag is answered as is.
+
+Everything is revalidated (``no-cache``) except TF-JS weight shards: the
+server rewrites ``model.json`` so every shard URL carries ``?v=<hash>``,
+and a shard requested with its current hash is ``immutable`` for a year.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover – optional dep, gzip only
+    brotli = None
+
+__all__ = ["Asset", "DiskFile", "StaticAssets", "PRECOMPRESS"]
+
+# worth compressing before the first client asks
+PRECOMPRESS = ("index.html", "app.js", "styles.css", "class_indices.json",
+               "pokedex_data.json", "web_model/model.json")
+COMPRESSIBLE = ("text/", "application/json", "application/javascript",
+                "application/manifest+json", "image/svg+xml")
+MIN_COMPRESS = 1024  # bytes; smaller bodies go out as-is
+VERSION_LEN = 16     # hex chars of the sha256 used in ``?v=``
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+CACHE_TOTAL = int(os.getenv("STATIC_CACHE_MB", "32")) * 2**20  # in-memory bodies, all files together
+MAX_ROUTES = 4096  # remembered URL -> file resolutions (``a/../b`` spellings are unbounded)
+
+mimetypes.add_type("application/manifest+json", ".webmanifest")
+mimetypes.add_type("application/javascript", ".js")
+
+
+def _mimetype(path: Path) -> Tuple[str, str]:
+    """``(bare type, Content-Type value)``."""
+    mt = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    return mt, mt + "; charset=utf-8" if mt.startswith("text/") else mt
+
+
+def _is_manifest(path: Path) -> bool:
+    return path.name == "model.json" and path.parent.name.startswith("web_model")
+
+
+def _etag(digest: str, encoding: str) -> str:
+    suffix = {"identity": "", "gzip": "-gz", "br": "-br"}[encoding]
+    return f'"{digest}{suffix}"'
+
+
+class Asset:
+    """One file's bytes, per encoding, plus the headers that go with them."""
+
+    def __init__(self, path: Path, data: bytes) -> None:
+        self.path = path
+        self.digest = hashlib.sha256(data).hexdigest()
+        mt, self.mimetype = _mimetype(path)
+        self.bodies: Dict[str, bytes] = {"identity": data}
+        if len(data) >= MIN_COMPRESS and mt.startswith(COMPRESSIBLE):
+            candidates = {"gzip": gzip.compress(data, 9, mtime=0)}
+            if brotli is not None:
+                candidates["br"] = brotli.compress(data, quality=11)
+            self.bodies.update({enc: b for enc, b in candidates.items() if len(b) < len(data)})
+
+    @property
+    def version(self) -> str:
+        return self.digest[:VERSION_LEN]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(map(len, self.bodies.values()))
+
+    def etag(self, encoding: str) -> str:
+        return _etag(self.digest, encoding)
+
+    def pick(self, accept_encoding: str) -> str:
+        """Best encoding we have that the client accepts (br > gzip > identity)."""
+        accepted = parse_accept_encoding(accept_encoding)
+        for enc in ("br", "gzip"):
+            if enc in self.bodies and accepted.get(enc, accepted.get("*", 0.0)) > 0:
+                return enc
+        return "identity"
+
+
+class DiskFile:
+    """A file served from disk: only its hash and headers live in memory."""
+
+    def __init__(self, path: Path, stamp: Tuple[int, int]) -> None:
+        self.path = path
+        self.stamp = stamp
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        self.digest = h.hexdigest()
+        self.mimetype = _mimetype(path)[1]
+
+    @property
+    def version(self) -> str:
+        return self.digest[:VERSION_LEN]
+
+    def etag(self, encoding: str = "identity") -> str:
+        return _etag(self.digest, encoding)
+
+    def pick(self, accept_encoding: str) -> str:
+        return "identity"
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """``"gzip, br;q=0.5, *;q=0"`` -> ``{"gzip": 1.0, "br": 0.5, "*": 0.0}``."""
+    out: Dict[str, float] = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        out[token.strip().lower()] = q
+    return out
+
+
+class StaticAssets:
+    """Cache of :class:`Asset` / :class:`DiskFile` entries under ``root``.
+
+    Parameters
+    ----------
+    root: Path
+        Directory requests are resolved against; nothing outside it is served.
+    max_bytes: int
+        Largest single file kept in memory.
+    max_total: int
+        Cap on all in-memory bodies together; later files go to disk.
+    """
+
+    def __init__(self, root: Path, max_bytes: int = 4 * 2**20, max_total: int = CACHE_TOTAL) -> None:
+        self.root = Path(root).resolve()
+        self.max_bytes = max_bytes
+        self.max_total = max_total
+        self.cached_bytes = 0
+        self._assets: Dict[str, Union[Asset, DiskFile]] = {}  # resolved path -> entry
+        self._routes: Dict[str, str] = {}  # request path -> resolved path, for files seen before
+        self._lock = threading.Lock()
+
+    def warm(self, rels: Iterable[str]) -> None:
+        """Load and compress ``rels`` now instead of on their first request."""
+        for rel in rels:
+            self.get(rel)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._assets.clear()
+            self._routes.clear()
+            self.cached_bytes = 0
+
+    def get(self, rel: str, version: Optional[str] = None) -> Optional[Union[Asset, DiskFile]]:
+        """Entry for ``rel``; a cached one is returned without disk access when
+        it is in memory, or on disk and requested with its current ``version``."""
+        key = self._routes.get(rel)
+        hit = self._assets.get(key) if key is not None else None
+        if isinstance(hit, Asset) or (hit is not None and version and version == hit.version):
+            return hit
+        if hit is not None:  # on disk, seen before: one stat() to catch changes
+            path = Path(hit.path)
+        else:
+            path = self.resolve(rel)
+            if path is None:  # missing files are never cached, so junk URLs can't grow the table
+                return None
+            key = str(path)
+            if len(self._routes) >= MAX_ROUTES:
+                self._routes.clear()
+            self._routes[rel] = key
+            hit = self._assets.get(key)
+            if isinstance(hit, Asset):
+                return hit
+        try:
+            st = path.stat()
+        except FileNotFoundError:  # deleted: forget it
+            with self._lock:
+                self._assets.pop(key, None)
+            self._routes.pop(rel, None)
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+        if isinstance(hit, DiskFile) and hit.stamp == stamp:
+            return hit
+        entry = self._load(path, rel, stamp)
+        with self._lock:
+            if isinstance(entry, Asset):
+                # cache full: hash only, body stays on disk (a rewritten model.json has no disk copy)
+                if self.cached_bytes + entry.nbytes > self.max_total and not _is_manifest(path):
+                    entry = DiskFile(path, stamp)
+                else:
+                    self.cached_bytes += entry.nbytes
+            self._assets[key] = entry
+        return entry
+
+    def respond(self, rel: str, accept_encoding: str = "", if_none_match: str = "",
+                version: Optional[str] = None) -> Optional[Tuple[int, Dict[str, str], Union[bytes, Path]]]:
+        """``(status, headers, body)`` for ``rel``, or ``None`` if it doesn't exist.
+
+        ``body`` is the bytes to send, or a :class:`Path` the caller streams
+        from disk with ``headers``.
+        """
+        asset = self.get(rel, version)
+        if asset is None:
+            return None
+        enc = asset.pick(accept_encoding)
+        etag = asset.etag(enc)
+        headers = {
+            "ETag": etag,
+            "Cache-Control": IMMUTABLE if version and version == asset.version else REVALIDATE,
+            "Vary": "Accept-Encoding",
+        }
+        if etag in if_none_match or if_none_match.strip() == "*":
+            return 304, headers, b""
+        headers["Content-Type"] = asset.mimetype
+        if isinstance(asset, DiskFile):
+            return 200, headers, asset.path
+        body = asset.bodies[enc]
+        headers["Content-Length"] = str(len(body))
+        if enc != "identity":
+            headers["Content-Encoding"] = enc
+        return 200, headers, body
+
+    # ------------------------------------------------------------------
+    def resolve(self, rel: str) -> Optional[Path]:
+        path = (self.root / rel).resolve()
+        if path != self.root and self.root not in path.parents:
+            return None
+        return path if path.is_file() else None
+
+    def _load(self, path: Path, rel: str, stamp: Tuple[int, int]) -> Union[Asset, DiskFile]:
+        if stamp[1] > self.max_bytes or not _mimetype(path)[0].startswith(COMPRESSIBLE):
+            return DiskFile(path, stamp)
+        data = path.read_bytes()
+        if _is_manifest(path):
+            data = self._version_shards(rel, data)
+        return Asset(path, data)
+
+    def _version_shards(self, rel: str, data: bytes) -> bytes:
+        """Append ``?v=<hash>`` to every weight shard path in a TF-JS ``model.json``.
+
+        Shards are binary, so :meth:`get` only hashes them; their bytes are
+        never held in memory.
+        """
+        try:
+            model = json.loads(data)
+            groups: List[dict] = model["weightsManifest"]
+        except (ValueError, KeyError, TypeError):
+            return data
+        base = rel.rsplit("/", 1)[0] + "/" if "/" in rel else ""
+        for group in groups:
+            versioned = []
+            for p in group.get("paths", []):
+                shard = self.get(base + p.split("?", 1)[0])
+                versioned.append(f"{p}?v={shard.version}" if shard is not None else p)
+            group["paths"] = versioned
+        return json.dumps(model, separators=(",", ":")).encode()
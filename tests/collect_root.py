@@ -0,0 +1,15 @@
+"""pytest plugin (see ``pytest.ini``): the repo root doubles as the Azure
+Functions package, whose ``__init__.py`` imports openai and azure.functions.
+Collect it as a plain directory so the tests don't import that entry point
+or need those packages."""
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def pytest_collect_directory(path: Path, parent: pytest.Collector):
+    if path == ROOT:
+        return pytest.Dir.from_parent(parent, path=path)
+    return None
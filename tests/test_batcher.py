@@ -0,0 +1,90 @@
+"""MicroBatcher: coalescing, cancellation and latest-frame-wins."""
+import threading
+import time
+from concurrent.futures import CancelledError
+
+import numpy as np
+import pytest
+
+from batcher import MicroBatcher
+
+
+class GatedModel:
+    """Records every batch it sees; blocks until ``gate`` is set."""
+
+    def __init__(self) -> None:
+        self.gate = threading.Event()
+        self.batches = []
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        self.gate.wait(5)
+        self.batches.append(x.copy())
+        return x.reshape(len(x), -1)[:, :1] * 2
+
+
+def busy_batcher(**kw):
+    """A batcher whose worker is stuck on a first frame, so later ones stay queued."""
+    model = GatedModel()
+    b = MicroBatcher(model, max_wait_ms=1, **kw)
+    first = b.submit(np.zeros(1))
+    deadline = time.monotonic() + 5
+    while not first.running() and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return b, model, first
+
+
+def test_coalesces_queued_frames_into_one_batch():
+    b, model, first = busy_batcher()
+    futs = [b.submit(np.full(1, i, np.float32)) for i in range(1, 5)]
+    model.gate.set()
+    assert [float(f.result(5)[0]) for f in futs] == [2.0, 4.0, 6.0, 8.0]
+    first.result(5)
+    assert [len(x) for x in model.batches] == [1, 4]
+    assert b.stats.snapshot()["batch_hist"] == {"1": 1, "4": 1}
+
+
+def test_cancelled_frame_never_reaches_the_model():
+    b, model, first = busy_batcher()
+    gone = b.submit(np.full(1, 7, np.float32))
+    kept = b.submit(np.full(1, 3, np.float32))
+    assert gone.cancel()
+    model.gate.set()
+    assert float(kept.result(5)[0]) == 6.0
+    first.result(5)
+    assert all(7 not in x for x in model.batches)
+    st = b.stats.snapshot()
+    assert (st["cancelled"], st["superseded"], st["items"]) == (1, 0, 2)
+
+
+def test_newer_frame_from_same_client_supersedes_older():
+    b, model, first = busy_batcher()
+    old = b.submit(np.full(1, 1, np.float32), key="client")
+    new = b.submit(np.full(1, 2, np.float32), key="client")
+    other = b.submit(np.full(1, 3, np.float32), key="other")
+    model.gate.set()
+    with pytest.raises(CancelledError):
+        old.result(5)
+    assert float(new.result(5)[0]) == 4.0
+    assert float(other.result(5)[0]) == 6.0
+    first.result(5)
+    st = b.stats.snapshot()
+    assert (st["superseded"], st["cancelled"]) == (1, 0)  # counted once, not twice
+
+
+def test_model_error_reaches_every_waiter():
+    def boom(x):
+        raise RuntimeError("backend down")
+
+    b = MicroBatcher(boom, max_wait_ms=1)
+    futs = [b.submit(np.zeros(1)) for _ in range(3)]
+    for f in futs:
+        with pytest.raises(RuntimeError, match="backend down"):
+            f.result(5)
+    assert b.stats.snapshot()["errors"] == 3
+
+
+def test_rejects_bad_limits():
+    with pytest.raises(ValueError):
+        MicroBatcher(lambda x: x, max_batch=0)
+    with pytest.raises(ValueError):
+        MicroBatcher(lambda x: x, max_wait_ms=-1)
@@ -0,0 +1,43 @@
+"""Exported backends must agree with Keras on real photos.
+
+Point ``PARITY_SAMPLES`` at a folder of real images (e.g. a few per class,
+any layout); the check never runs on random tensors.  Backends whose
+artefact hasn't been exported yet are skipped.
+
+    PARITY_SAMPLES=~/dex-photos python -m pytest tests/test_export_parity.py
+"""
+import os
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("tensorflow")
+
+from export_model import EXPORTERS, MODEL_PATH, SUFFIXES, check_parity, load_samples  # noqa: E402
+from inference import KerasBackend, _load_keras_model, load_backend  # noqa: E402
+
+SAMPLES = os.getenv("PARITY_SAMPLES")
+LIMIT = int(os.getenv("PARITY_LIMIT", "32"))
+MIN_AGREEMENT = float(os.getenv("PARITY_MIN_AGREEMENT", "0.99"))
+
+pytestmark = [
+    pytest.mark.skipif(not SAMPLES, reason="set PARITY_SAMPLES to a folder of real images"),
+    pytest.mark.skipif(not MODEL_PATH.exists(), reason=f"{MODEL_PATH.name} not present"),
+]
+
+
+@pytest.fixture(scope="module")
+def model():
+    return _load_keras_model(MODEL_PATH)
+
+
+@pytest.fixture(scope="module")
+def samples(model):
+    return load_samples(Path(SAMPLES).expanduser(), LIMIT, model.input_shape[1:], seed=0)
+
+
+@pytest.mark.parametrize("fmt", EXPORTERS)
+def test_backend_matches_keras(fmt, model, samples):
+    if not MODEL_PATH.with_suffix(SUFFIXES[fmt]).exists():
+        pytest.skip(f"{fmt} not exported (python export_model.py --formats {fmt})")
+    assert check_parity(KerasBackend(model), {fmt: load_backend(fmt, MODEL_PATH)}, samples, MIN_AGREEMENT)
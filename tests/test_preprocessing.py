@@ -0,0 +1,30 @@
+"""Golden check: NumPy preprocessing is bit-identical to Keras' resnet50.preprocess_input."""
+import numpy as np
+import pytest
+
+tf = pytest.importorskip("tensorflow")
+
+from preprocessing import BatchBuffer, caffe_preprocess  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def imgs():
+    return np.random.default_rng(0).integers(0, 256, (8, 224, 224, 3), dtype=np.uint8)
+
+
+@pytest.fixture(scope="module")
+def want(imgs):
+    return tf.keras.applications.resnet50.preprocess_input(imgs.astype(np.float32))
+
+
+@pytest.mark.parametrize("case", ["single RGB", "batch RGB", "BatchBuffer", "BGRA input"])
+def test_matches_keras(case, imgs, want):
+    got = {
+        "single RGB": lambda: np.stack([caffe_preprocess(i) for i in imgs]),
+        "batch RGB": lambda: caffe_preprocess(imgs),
+        "BatchBuffer": lambda: BatchBuffer(16).fill(list(imgs)),
+        "BGRA input": lambda: caffe_preprocess(np.concatenate([imgs[..., ::-1], imgs[..., :1]], -1),
+                                               order="BGRA"),
+    }[case]()
+    assert got.dtype == np.float32
+    assert np.array_equal(got, want)
@@ -0,0 +1,90 @@
+"""Stability trackers: the streak/EMA rules, the LRU table and the shared store."""
+import socket
+import time
+
+import numpy as np
+import pytest
+
+import stability
+from stability import EmaStabilityTracker, StabilityTracker, make_tracker
+
+
+def one_hot(idx, conf=0.9, classes=4):
+    p = np.full(classes, (1 - conf) / (classes - 1), np.float32)
+    p[idx] = conf
+    return p
+
+
+def test_streak_needs_window_confident_agreeing_frames():
+    t = StabilityTracker(3, 0.5)
+    assert [t.update("a", one_hot(1)) for _ in range(3)] == [False, False, True]
+    assert not t.update("a", one_hot(1, conf=0.3))  # under thresh
+    assert not t.update("a", one_hot(2))            # class changed
+    assert not t.update("b", one_hot(1))            # clients don't share history
+
+
+def test_ema_rides_out_one_noisy_frame():
+    t = EmaStabilityTracker(0.5, 0.35)
+    assert not t.update("a", one_hot(1))  # min_frames
+    assert t.update("a", one_hot(1))
+    assert not t.update("a", one_hot(2, conf=0.5))  # disagrees with the average
+    assert t.update("a", one_hot(1))
+    with pytest.raises(ValueError):
+        EmaStabilityTracker(0, 0.35)
+
+
+def test_table_evicts_least_recently_seen_and_expires_idle():
+    t = StabilityTracker(2, 0.5, max_clients=2)
+    for cid in ("a", "b", "a", "c"):
+        t.update(cid, one_hot(0))
+    assert len(t) == 2 and t.evicted == 1
+    assert not t.update("b", one_hot(0))  # evicted: history starts over
+    t.ttl = 0
+    time.sleep(0.01)
+    t.update("d", one_hot(0))
+    assert len(t) == 1 and t.expired == 2
+
+
+def test_make_tracker_rejects_unknown_names():
+    with pytest.raises(ValueError):
+        make_tracker("local", "vote", 3, 0.5)
+    with pytest.raises(ValueError):
+        make_tracker("redis", "streak", 3, 0.5)
+
+
+def test_shared_store_is_one_history_for_every_worker(tmp_path):
+    address = str(tmp_path / "s" / "stability.sock")
+    host = make_tracker("shared", "streak", 2, 0.5, address=address)
+    worker = make_tracker("shared", "streak", 2, 0.5, address=address)
+    assert not host.update("a", one_hot(3))  # first call elects the host
+    assert worker.update("a", one_hot(3))    # sees the host's frame
+    assert worker.stats()["clients"] == 1 and worker.stats()["shared"]
+    assert len(worker._fallback) == 0
+
+
+def test_wedged_host_falls_back_to_local(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(stability, "SOCKET_TIMEOUT", 0.02)
+    address = str(tmp_path / "s" / "stability.sock")
+    stability.private_dir(address)
+    wedged = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)  # accepts, never answers
+    wedged.bind(address)
+    wedged.listen(8)
+    try:
+        t = make_tracker("shared", "streak", 2, 0.5, address=address)
+        t0 = time.monotonic()
+        assert not t.update("a", one_hot(0))
+        assert t.update("a", one_hot(0))  # second call skips the socket entirely
+        assert time.monotonic() - t0 < 1
+        assert len(t._fallback) == 1
+        assert "timed out" in capsys.readouterr().err
+    finally:
+        wedged.close()
+
+
+def test_shared_store_refuses_a_directory_others_can_enter(tmp_path):
+    d = tmp_path / "open"
+    d.mkdir(mode=0o755)
+    d.chmod(0o755)
+    t = make_tracker("shared", "streak", 1, 0.5, address=str(d / "stability.sock"))
+    assert t.update("a", one_hot(0))
+    assert t.stats()["shared"] is False
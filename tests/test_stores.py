@@ -0,0 +1,127 @@
+"""The in-memory stores, the usage pack and the SQLite file serve the same bytes."""
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from data_db import DexDB, FlavorDB, UsageDB, build_db
+from dex_store import DexStore
+from flavor_store import FlavorStore
+from usage_store import FIELDS, UsageStore
+
+ROOT = Path(__file__).resolve().parent.parent
+
+DEX_SLUGS = ("abomasnow", "pikachu", "mrmime", "deoxys")
+USAGE = {
+    "Garchomp": {
+        "moves": ["Earthquake", "Scale Shot", "Swords Dance", "Stealth Rock", "Fire Fang", "Iron Head",
+                  "Stone Edge", "Outrage"],
+        "abilities": ["Rough Skin", "Sand Veil"],
+        "full_sets": {
+            "OU": [{"name": "Scarf", "moves": ["Earthquake", "Outrage", "Item: Choice Scarf",
+                                               "Ability: Rough Skin", "Jolly Nature", "252 Atk / 4 SpD / 252 Spe",
+                                               "Written by someone"]}],
+            "UU": [{"name": "SD", "moves": ["Swords Dance", "Scale Shot"]},
+                   {"name": "Lead", "moves": ["Stealth Rock"]}],
+        },
+    },
+    "Mr. Mime": {"moves": ["Psychic"], "items": ["Light Clay"]},
+    "Tapu Koko": {"full_sets": {"OU": [{"name": "Volt", "moves": ["Volt Switch"]}]}},
+    "mr-mime": {"moves": ["Reflect"]},  # same key as "Mr. Mime": the later entry wins
+}
+FLAVOR = {
+    "pikachu": ["It keeps its tail raised.", "IT KEEPS ITS  TAIL\nRAISED.", "Sparks fly."],
+    "pikachu-gmax": ["Sparks fly.", "Its gigantic tail."],
+    "mr-mime": ["A MR. MIME is a master of pantomime."],
+    "tapu-koko": [],
+}
+LOOKUPS = ("garchomp", "Garchomp", "mrmime", "Mr. Mime", "mr-mime", "tapukoko", "tapu-koko", "missing")
+
+
+@pytest.fixture(scope="module")
+def sources(tmp_path_factory):
+    d = tmp_path_factory.mktemp("data")
+    dex = json.loads((ROOT / "pokedex_data.json").read_text("utf-8"))
+    rows = {s: dex[s] for s in DEX_SLUGS}
+    rows["deoxys-attack"] = {**dex["deoxys"], "types": ["psychic", "fighting"]}  # a second form of #386
+    (d / "dex.json").write_text(json.dumps(rows), "utf-8")
+    # written by hand to keep the duplicate key json.dumps would drop
+    usage = "{" + ",".join(f"{json.dumps(k)}:{json.dumps(v)}" for k, v in USAGE.items()) + "}"
+    (d / "usage.json").write_text(usage, "utf-8")
+    (d / "flavor.json").write_text(json.dumps(FLAVOR), "utf-8")
+    build_db(d / "data.db", d / "dex.json", d / "usage.json", d / "flavor.json")
+    return d
+
+
+@pytest.fixture(scope="module")
+def usage(sources):
+    return UsageStore.load(sources / "usage.json")
+
+
+def usage_views(store):
+    return {
+        (slug, tier, fields): store.json(slug, tier=tier, fields=fields)
+        for slug in LOOKUPS for tier in (None, "OU", "UU", "ZU") for fields in FIELDS
+    } | {(slug, "tiers"): store.tiers(slug) for slug in LOOKUPS}
+
+
+def test_usage_store_normalises_keys_and_keeps_the_last_duplicate(usage):
+    assert len(usage) == 3
+    assert usage.json("Mr. Mime") == usage.json("mrmime") == b'{"moves":["Reflect"],"full_sets":{}}'
+    assert json.loads(usage.json("garchomp", fields="summary"))["moves"] == USAGE["Garchomp"]["moves"][:6]
+    assert json.loads(usage.json("garchomp", tier="UU", fields="sets")) == {
+        "full_sets": {"UU": json.loads(usage.json("garchomp"))["full_sets"]["UU"]}}
+    assert json.loads(usage.tiers("garchomp")) == {"tiers": ["OU", "UU"], "sets": {"OU": 1, "UU": 2}}
+    with pytest.raises(ValueError):
+        usage.json("garchomp", fields="everything")
+
+
+def test_usage_pack_matches_store(sources, usage, tmp_path):
+    pytest.importorskip("msgpack")
+    from usage_pack import UsagePack, write_pack
+
+    assert write_pack(sources / "usage.json", tmp_path / "usage.pack") == len(usage)
+    pack = UsagePack.open(tmp_path / "usage.pack")
+    assert (len(pack), pack.raw_count, pack.version) == (len(usage), usage.raw_count, usage.version)
+    assert usage_views(pack) == usage_views(usage)
+
+
+def test_usage_db_matches_store(sources, usage):
+    db = UsageDB(sources / "data.db")
+    assert (len(db), db.raw_count, db.version) == (len(usage), usage.raw_count, usage.version)
+    assert usage_views(db) == usage_views(usage)
+
+
+def test_dex_db_matches_store(sources):
+    store, db = DexStore.load(sources / "dex.json"), DexDB(sources / "data.db")
+    assert (len(db), db.version) == (len(store), store.version)
+    keys = [*store.slugs, "PIKACHU", "25", "386", "0", "٢٥", "²", "missing"]
+    assert [db.json(k) for k in keys] == [store.json(k) for k in keys]
+    assert store.json("386") == store.json("deoxys") != store.json("deoxys-attack")  # first form wins
+    assert store.json("٢٥") is None  # non-ASCII digits are slugs, not dex numbers
+
+
+def test_flavor_db_matches_store(sources):
+    store, db = FlavorStore.load(sources / "flavor.json"), FlavorDB(sources / "data.db")
+    assert (len(db), db.version) == (len(store), store.version)
+    for slug in [*FLAVOR, "mrmime", "Mr. Mime", "tapukoko", "PikachuGmax", "missing"]:
+        assert db.json(slug) == store.json(slug)
+        assert db.json(slug, first=True) == store.json(slug, first=True)
+
+
+def test_flavor_store_dedups_within_and_across_species(sources):
+    store = FlavorStore.load(sources / "flavor.json")
+    # case / whitespace variants collapse onto the first spelling
+    assert json.loads(store.json("pikachu")) == ["It keeps its tail raised.", "Sparks fly."]
+    assert json.loads(store.json("pikachu", first=True)) == ["It keeps its tail raised."]
+    assert store.json("tapukoko") == b"[]"
+    assert store.get("mrmime") == store.json("mr-mime")
+    r = store.report()
+    assert (r["species"], r["lines"], r["unique"], r["kept"]) == (4, 6, 4, 5)
+
+
+def test_db_file_is_opened_read_only(sources):
+    db = DexDB(sources / "data.db")
+    with pytest.raises(sqlite3.OperationalError):
+        db._query("DELETE FROM dex")
@@ -0,0 +1,132 @@
+"""usage_pack.py
+----------------------------------
+Compact, indexed binary form of ``usage_data.json`` that the server
+memory-maps instead of parsing.
+
+Usage::
+
+    python usage_pack.py                              # usage_data.json -> usage_data.pack
+    python usage_pack.py dumps/all_gens.json -o usage_data.pack
+
+    usage = UsagePack.open("usage_data.pack")         # same API as UsageStore
+    usage.json("garchomp", tier="OU", fields="sets")
+
+The converter streams the JSON one species at a time (with ``ijson``;
+see :func:`usage_store.iter_json_items`), runs the set parser and
+serialises the response fragments exactly as :class:`UsageStore` would,
+and writes each species as one msgpack segment:
+
+``MAGIC``                              8 bytes
+segment * n                            msgpack ``[rest, index, {tier: sets}]`` (JSON fragments)
+index                                  msgpack ``{"version", "raw_count", "keys": {key: [offset, length]}}``
+``<index offset><index length>MAGIC``  two little-endian uint64 + 8 bytes
+
+Opening a pack maps the file and decodes only the index; a lookup decodes
+that one species' segment, so worker memory no longer grows with the
+dump, and the mapped pages are shared by every worker through the page
+cache.  Recently decoded species are kept in a small per-worker LRU
+(``USAGE_PACK_CACHE``).  ``version`` is the hash of the source JSON, so
+``X-Data-Version`` stays the same whichever form is served.
+
+The pack is written to a temporary file and renamed into place, so a
+worker that still maps the old pack keeps reading it until hot reload
+swaps in the new one.
+"""
+from __future__ import annotations
+
+import argparse
+import functools
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+from typing import Optional
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover – optional dep
+    raise ImportError("usage packs need msgpack: pip install msgpack") from None
+
+from usage_sets import parse_usage
+from usage_store import UsageStore, _Entry, file_version, iter_json_items, normalize_key
+
+__all__ = ["UsagePack", "write_pack"]
+
+MAGIC = b"PKUSAGE1"
+TRAILER = struct.Struct("<QQ8s")
+PACK_CACHE = int(os.getenv("USAGE_PACK_CACHE", "256"))  # decoded species per worker
+
+ROOT = Path(__file__).resolve().parent
+
+
+def write_pack(src: Path, dst: Path) -> int:
+    """Convert ``src`` JSON into a pack at ``dst``; returns the species count."""
+    dst = Path(dst)
+    tmp = dst.with_name(dst.name + ".tmp")
+    keys = {}
+    raw_count = 0
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        for name, blob in iter_json_items(src):
+            raw_count += 1
+            seg = msgpack.packb(_Entry(parse_usage(blob)).parts(), use_bin_type=True)
+            keys[normalize_key(name)] = [f.tell(), len(seg)]  # a later duplicate wins, as in UsageStore
+            f.write(seg)
+        index = msgpack.packb({"version": file_version(src), "raw_count": raw_count, "keys": keys},
+                              use_bin_type=True)
+        offset = f.tell()
+        f.write(index)
+        f.write(TRAILER.pack(offset, len(index), MAGIC))
+    os.replace(tmp, dst)
+    return len(keys)
+
+
+class UsagePack(UsageStore):
+    """Read-only :class:`UsageStore` backed by a memory-mapped pack file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < len(MAGIC) + TRAILER.size or self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a usage pack")
+        offset, length, magic = TRAILER.unpack_from(self._map, len(self._map) - TRAILER.size)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is truncated")
+        index = msgpack.unpackb(self._map[offset:offset + length], raw=False)
+        self.version = index["version"]
+        self.raw_count = index["raw_count"]
+        self._keys = {k: tuple(v) for k, v in index["keys"].items()}
+        self._decode = functools.lru_cache(maxsize=PACK_CACHE)(self._decode_key)
+
+    @classmethod
+    def open(cls, path: Path) -> "UsagePack":
+        return cls(path)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _entry(self, slug: str) -> Optional[_Entry]:
+        key = normalize_key(slug)
+        return self._decode(key) if key in self._keys else None
+
+    def _decode_key(self, key: str) -> _Entry:
+        offset, length = self._keys[key]
+        return _Entry.from_parts(*msgpack.unpackb(self._map[offset:offset + length], raw=False))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Convert usage_data.json into a memory-mappable usage pack.")
+    ap.add_argument("src", type=Path, nargs="?", default=ROOT / "usage_data.json")
+    ap.add_argument("-o", "--out", type=Path, help="output path (default <src>.pack)")
+    args = ap.parse_args()
+
+    out = args.out or args.src.with_suffix(".pack")
+    n = write_pack(args.src, out)
+    print(f"[✓] {n} species -> {out} ({out.stat().st_size / 2**20:.1f} MB, "
+          f"source {args.src.stat().st_size / 2**20:.1f} MB)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""usage_sets.py
+----------------------------------
+Turn the free-text competitive sets in ``usage_data.json`` into structured
+records, once, on the server.
+
+Each ``full_sets[tier]`` entry arrives as ``{"name": ..., "moves": [lines]}``
+where the lines mix moves with item, ability, nature, EV/IV, tera and
+writer-credit lines.  :func:`parse_set` sorts them out exactly the way
+``app.js`` used to on every stats view::
+
+    {"name": "Choice Scarf", "parsed": true,
+     "moves": [{"name": "Surf", "desc": "..."}],
+     "item": "Choice Scarf", "ability": "Swift Swim", "nature": "Timid",
+     "evs": "252 SpA / 4 SpD / 252 Spe", "ivs": "0 Atk",
+     "teratypes": "Water", "credits": "Written by ..."}
+
+Empty fields are left out.  ``parsed: true`` tells the client to render
+the record as-is.
+"""
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List
+
+__all__ = ["parse_set", "parse_usage"]
+
+NATURES = frozenset((
+    "Hardy", "Lonely", "Brave", "Adamant", "Naughty", "Bold", "Docile", "Relaxed", "Impish",
+    "Lax", "Timid", "Hasty", "Serious", "Jolly", "Naive", "Modest", "Mild", "Quiet", "Bashful",
+    "Rash", "Calm", "Gentle", "Sassy", "Careful", "Quirky",
+))
+CLEAN_MOVE_RE = re.compile(
+    r"^(.*?)\s{0,2}(?:\d+%|\d+\s*/|Has|This|Usually|User|Target|BPA|Power|Accuracy|Category|Type|\(|$)",
+    re.I)
+EV_RE      = re.compile(r"^\s*\d+\s+(HP|Atk|Def|SpA|SpD|Spe)\s*$", re.I)
+CREDIT_RE  = re.compile(r"^(written|quality checked|grammar checked)\b", re.I)
+ABILITY_RE = re.compile(r"this pokemon'?s ", re.I)
+ITEM_RE    = re.compile(r"(choice|band|scarf|boots|orb|helmet|leftovers|berry|vest|plate|seed|belt)", re.I)
+TERA_RE    = re.compile(r"^tera( type)?:?", re.I)
+DOUBLE_SEP = re.compile(r"\s*/\s*/\s*")
+LEAD_RE    = re.compile(r"^[-–•\s]+")
+TRAIL_RE   = re.compile(r"[-–•]+$")
+HOLDER_RE  = re.compile(r"\bHolder'?s.*$", re.I)
+BLURB_RE   = re.compile(r"This Pokémon.*", re.I)
+
+
+def clean_move(m: str) -> str:
+    match = CLEAN_MOVE_RE.match(m.strip())
+    return TRAIL_RE.sub("", match.group(1) if match else m).strip()
+
+
+def format_ev(ev: Any) -> str:
+    """``{"spa": 252, "spe": 252}`` -> ``"252 SPA / 252 SPE"``; strings pass through."""
+    if isinstance(ev, str):
+        return ev
+    return " / ".join(f"{v} {k.upper()}" for k, v in (ev or {}).items())
+
+
+def _after_colon(line: str) -> str:
+    return line.split(":", 1)[1] if ":" in line else ""
+
+
+def _append(set_: Dict[str, Any], key: str, value: str) -> None:
+    prev = set_.get(key)
+    set_[key] = f"{prev} / {value}" if prev else value
+
+
+def parse_set(src: Dict[str, Any]) -> Dict[str, Any]:
+    """One structured set record from a raw ``full_sets`` entry."""
+    if src.get("parsed"):
+        return src
+    out: Dict[str, Any] = {k: v for k, v in src.items() if k != "moves"}
+    for k in ("evs", "ivs"):
+        if k in out:
+            out[k] = format_ev(out[k])
+    moves: List[Dict[str, str]] = []
+    credits: List[str] = []
+
+    for raw in src.get("moves") if isinstance(src.get("moves"), list) else []:
+        if not isinstance(raw, str):
+            continue
+        line = LEAD_RE.sub("", raw).strip()
+        if not line:
+            continue
+        low = line.lower()
+        if CREDIT_RE.match(low):
+            credits.append(line)
+        elif low.startswith("evs:") or EV_RE.match(line):
+            _append(out, "evs", line)
+        elif low.startswith("ivs:"):
+            _append(out, "ivs", line[4:].strip())
+        elif line.strip() in NATURES:
+            _append(out, "nature", line)
+        elif low.startswith("nature:"):
+            out["nature"] = _after_colon(line).strip()
+        elif low.startswith("ability:"):
+            out["ability"] = BLURB_RE.sub("", _after_colon(line)).strip()
+        elif ABILITY_RE.search(low):
+            out["ability"] = BLURB_RE.sub("", line).strip()
+        elif low.startswith("item:") or ITEM_RE.search(low):
+            _append(out, "item", HOLDER_RE.sub("", _after_colon(line) or line).strip())
+        elif low.startswith("tera"):
+            _append(out, "teratypes", TERA_RE.sub("", line).strip())
+        else:
+            name = clean_move(line)
+            moves.append({"name": name, "desc": line[len(name):].strip()})
+
+    seen = set()
+    out["moves"] = [m for m in moves if not (m["name"] in seen or seen.add(m["name"]))]
+    if credits:
+        out["credits"] = " • ".join(dict.fromkeys(credits))
+    for k in ("item", "ability", "nature", "teratypes"):
+        if isinstance(out.get(k), str):
+            out[k] = DOUBLE_SEP.sub(" / ", out[k])
+    out["parsed"] = True
+    return {k: v for k, v in out.items() if v not in ("", None, [])}
+
+
+def parse_usage(blob: Any) -> Any:
+    """``blob`` with every ``full_sets`` tier list replaced by parsed records."""
+    if not isinstance(blob, dict) or not isinstance(blob.get("full_sets"), dict):
+        return blob
+    sets = {tier: [parse_set(s) for s in lst if isinstance(s, dict)] if isinstance(lst, list) else lst
+            for tier, lst in blob["full_sets"].items()}
+    return {**blob, "full_sets": sets}
@@ -0,0 +1,181 @@
+"""usage_store.py
+----------------------------------
+Competitive usage data, keyed and serialised once at load.
+
+Usage::
+
+    usage = UsageStore.load(USAGE_PATH)   # missing file -> empty store
+    usage.json("Mr. Mime")                # b'{"moves":[...],...}' or None
+    usage.json("garchomp", tier="OU", fields="sets")
+    usage.tiers("garchomp")               # b'{"tiers":["OU","UU"],"sets":{"OU":3,...}}'
+
+Keys are normalised with :func:`normalize_key` (lower-case, alphanumerics
+only), so ``"Mr. Mime"``, ``"mr-mime"`` and ``"mrmime"`` all hit the same
+entry.  Free-text competitive sets are split into structured records
+(:func:`usage_sets.parse_usage`) before encoding, so clients render them
+as-is.  Only the encoded bytes are kept; the parsed objects are dropped
+after load.  With the optional ``ijson`` package the file is streamed one
+species at a time instead of being parsed whole.
+
+Projections
+-----------
+The UI shows one tier tab at a time and only the first ``SUMMARY_N``
+moves / abilities / items, so each species is stored as fragments that
+responses are spliced from:
+
+``fields=summary``   everything but ``full_sets``, lists cut to ``SUMMARY_N``
+``fields=sets``      ``{"full_sets": {...}}`` only
+``tier=<name>``      narrows ``full_sets`` to that tier (alone or with ``sets``)
+(default)            the whole blob
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, Tuple, Union
+
+from usage_sets import parse_usage
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover – optional dep, whole-file json.loads
+    ijson = None
+
+__all__ = ["UsageStore", "normalize_key", "iter_json_items", "file_version", "FIELDS"]
+
+SUMMARY_N = 6
+FIELDS = ("all", "summary", "sets")
+
+_NORMALIZE_RE = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_key(k: str) -> str:
+    return _NORMALIZE_RE.sub("", k.lower())
+
+
+def encode(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def file_version(path: Path) -> str:
+    """First 12 hex chars of the file's sha256, read in chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:12]
+
+
+def iter_json_items(path: Path) -> Iterator[Tuple[str, Any]]:
+    """``(key, value)`` pairs of a top-level JSON object, streamed if ``ijson`` is installed."""
+    if ijson is None:
+        yield from json.loads(Path(path).read_bytes()).items()
+        return
+    with open(path, "rb") as f:
+        yield from ijson.kvitems(f, "", use_float=True)
+
+
+def _summary(rest: Dict[str, Any]) -> bytes:
+    return encode({k: v[:SUMMARY_N] if isinstance(v, list) else v for k, v in rest.items()})
+
+
+class _Entry:
+    """One species' usage blob as pre-serialised fragments."""
+
+    __slots__ = ("rest", "summary", "tiers", "index")
+
+    def __init__(self, blob: Any) -> None:
+        if not isinstance(blob, dict):
+            blob = {}
+        full_sets = blob.get("full_sets")
+        full_sets = full_sets if isinstance(full_sets, dict) else {}
+        rest = {k: v for k, v in blob.items() if k != "full_sets"}
+        self.rest = encode(rest)
+        self.summary = _summary(rest)
+        self.tiers: Dict[str, bytes] = {t: encode(full_sets[t]) for t in sorted(full_sets)}
+        self.index = encode({
+            "tiers": list(self.tiers),
+            "sets": {t: len(v) if isinstance(v, list) else 0 for t, v in sorted(full_sets.items())},
+        })
+
+    @classmethod
+    def from_parts(cls, rest: bytes, index: bytes, tiers: Dict[str, bytes]) -> "_Entry":
+        """Rebuild an entry from :meth:`parts` (e.g. read back from a usage pack)."""
+        entry = cls.__new__(cls)
+        entry.rest, entry.index, entry.tiers = rest, index, tiers
+        entry.summary = _summary(json.loads(rest))
+        return entry
+
+    def parts(self) -> list:
+        """What a usage pack stores; ``summary`` is cheap to re-derive from ``rest``."""
+        return [self.rest, self.index, self.tiers]
+
+    def sets(self, tier: Optional[str] = None) -> bytes:
+        """``"full_sets":{...}`` for every tier, or just ``tier``."""
+        tiers = self.tiers if tier is None else {t: b for t, b in self.tiers.items() if t == tier}
+        body = b",".join(encode(t) + b":" + b for t, b in tiers.items())
+        return b'"full_sets":{' + body + b"}"
+
+    def render(self, tier: Optional[str], fields: str) -> bytes:
+        if fields == "summary":
+            return self.summary
+        if fields == "sets":
+            return b"{" + self.sets(tier) + b"}"
+        if self.rest == b"{}":
+            return b"{" + self.sets(tier) + b"}"
+        return self.rest[:-1] + b"," + self.sets(tier) + b"}"
+
+
+class UsageStore:
+    """Read-only usage blobs by normalised species key.
+
+    Parameters
+    ----------
+    raw: Mapping[str, Any] | Iterable[tuple[str, Any]]
+        ``usage_data.json`` contents, species name -> usage blob, as a
+        mapping or a stream of pairs (:func:`iter_json_items`).
+    """
+
+    def __init__(self, raw: Union[Mapping[str, Any], Iterable[Tuple[str, Any]]]) -> None:
+        self.raw_count = 0
+        self._entries: Dict[str, _Entry] = {}
+        for k, v in raw.items() if isinstance(raw, Mapping) else raw:
+            self.raw_count += 1
+            self._entries[normalize_key(k)] = _Entry(parse_usage(v))
+
+    version = ""  # content hash of the file it was loaded from; "none" if missing
+
+    @classmethod
+    def load(cls, path: Path) -> "UsageStore":
+        path = Path(path)
+        if not path.exists():
+            store = cls({})
+            store.version = "none"
+            return store
+        store = cls(iter_json_items(path))
+        store.version = file_version(path)
+        return store
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _entry(self, slug: str) -> Optional[_Entry]:
+        return self._entries.get(normalize_key(slug))
+
+    def json(self, slug: str, tier: Optional[str] = None, fields: Optional[str] = None) -> Optional[bytes]:
+        """The species' usage, projected (see module docstring); ``None`` if unknown.
+
+        Raises ``ValueError`` for a ``fields`` value not in :data:`FIELDS`.
+        """
+        fields = fields or "all"
+        if fields not in FIELDS:
+            raise ValueError(f"unknown fields {fields!r} (choose from {', '.join(FIELDS)})")
+        entry = self._entry(slug)
+        return None if entry is None else entry.render(tier, fields)
+
+    def tiers(self, slug: str) -> Optional[bytes]:
+        """``{"tiers": [...], "sets": {tier: count}}`` for the species, or ``None``."""
+        entry = self._entry(slug)
+        return None if entry is None else entry.index